@@ -0,0 +1,473 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metricas import anotar
+from prompts import ESQUEMA_RESPUESTA, PLANTILLAS
+from reglas import preclasificar
+from respuestas import LectorRespuesta, parsear_respuesta, parsear_respuesta_lote, validar_resultado
+
+
+# === ERRORES DEL PROVEEDOR ===
+class ErrorProveedor(Exception):
+    # Error transitorio del proveedor (cuota, sobrecarga, caída momentánea) que vale la pena
+    # reintentar. `limite_tasa` indica un 429/cuota agotada y `espera` el tiempo sugerido por
+    # el proveedor (Retry-After o retry_delay), en segundos, si lo informó.
+    def __init__(self, mensaje, limite_tasa=False, espera=None):
+        super().__init__(mensaje)
+        self.limite_tasa = limite_tasa
+        self.espera = espera
+
+
+def segundos_sugeridos(texto):
+    # Extrae la espera sugerida de mensajes como "Please retry in 12.5s" o "retry_delay { seconds: 30 }".
+    coincidencia = re.search(r"retry in ([\d.]+)\s*s|seconds:\s*(\d+)", str(texto), re.IGNORECASE)
+    if coincidencia is None:
+        return None
+    return float(coincidencia.group(1) or coincidencia.group(2))
+
+
+def segundos_retry_after(valor):
+    # Retry-After puede venir en segundos o como fecha HTTP.
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        fecha = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, fecha.timestamp() - time.time())
+
+
+# === CONSUMO DE TOKENS ===
+class UsoTokens:
+    # Acumula los tokens informados por el proveedor en cada llamada.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.llamadas = 0
+        self.prompt = 0
+        self.respuesta = 0
+        self.en_cache = 0
+        self.segundos_prefill = 0.0
+
+    def registrar(self, prompt=0, respuesta=0, en_cache=0, segundos_prefill=0.0):
+        with self.lock:
+            self.llamadas += 1
+            self.prompt += prompt or 0
+            self.respuesta += respuesta or 0
+            self.en_cache += en_cache or 0
+            self.segundos_prefill += segundos_prefill or 0.0
+        anotar(tokens_prompt=prompt, tokens_respuesta=respuesta, tokens_cache=en_cache)
+
+    def por_llamada(self):
+        llamadas = max(1, self.llamadas)
+        return self.prompt / llamadas, self.respuesta / llamadas
+
+
+# === INTERFAZ COMÚN DE LOS MODELOS ===
+class Backend(ABC):
+    # Cada backend se crea una sola vez y se reutiliza entre filas y reruns de Streamlit,
+    # de modo que las conexiones y los clientes del modelo no se reconstruyen por fila.
+    nombre = ""
+    etiqueta = ""  # sufijo de las columnas de salida: Clasificacion-<etiqueta>
+    modelo = ""
+    plantilla_predeterminada = "completa"
+    costo_relativo = 10  # orden de la cascada (ver cascada.py): primero el más barato
+
+    # Valores iniciales de los controles del modo archivo.
+    solicitudes_por_minuto = 12
+    tamano_lote = 10
+    trabajadores = 4
+
+    def __init__(self, plantilla=None):
+        self.plantilla = PLANTILLAS[plantilla or self.plantilla_predeterminada]
+        self.uso = UsoTokens()
+
+    @property
+    def version_prompt(self):
+        # Forma parte de la clave de la cache de clasificaciones y de los trabajos guardados.
+        return self.plantilla.version
+
+    @abstractmethod
+    def llamar_modelo(self, sistema, usuario):
+        # Devuelve el texto generado por el modelo o lanza una excepción. `sistema` son las
+        # instrucciones fijas de la plantilla y `usuario` el texto a clasificar. Los errores
+        # transitorios se lanzan como ErrorProveedor para que lotes.ControladorAdaptativo
+        # los reintente; el resto se devuelve como ERROR.
+        raise NotImplementedError
+
+    def _llamar_medido(self, sistema, usuario):
+        # Anota en metricas el tiempo de la llamada al proveedor (red y generación).
+        inicio = time.perf_counter()
+        try:
+            return self.llamar_modelo(sistema, usuario)
+        finally:
+            anotar(segundos_llamada=time.perf_counter() - inicio)
+
+    def clasificar(self, texto):
+        try:
+            respuesta = self._llamar_medido(self.plantilla.sistema, self.plantilla.usuario(texto))
+        except ErrorProveedor:
+            raise
+        except Exception as e:
+            anotar(error=type(e).__name__)
+            return "ERROR", str(e)
+        inicio = time.perf_counter()
+        resultado = validar_resultado(*parsear_respuesta(respuesta))
+        anotar(segundos_parseo=time.perf_counter() - inicio)
+        return resultado
+
+    def clasificar_lote(self, textos):
+        # Clasifica varios incidentes con una sola solicitud; los ids faltantes quedan en None.
+        try:
+            respuesta = self._llamar_medido(self.plantilla.sistema_lote, self.plantilla.usuario_lote(textos))
+        except ErrorProveedor:
+            raise
+        except Exception as e:
+            anotar(error=type(e).__name__)
+            return [("ERROR", str(e))] * len(textos)
+        inicio = time.perf_counter()
+        resultados = parsear_respuesta_lote(respuesta, len(textos))
+        anotar(segundos_parseo=time.perf_counter() - inicio)
+        return resultados
+
+    def llamar_modelo_streaming(self, sistema, usuario):
+        # Generador de fragmentos de la respuesta en formato JSON. Cerrarlo antes de terminar
+        # corta la generación. Sin streaming propio se entrega la respuesta completa.
+        yield self.llamar_modelo(sistema, usuario)
+
+    def clasificar_streaming(self, texto):
+        # Generador de (categoria, razon) parciales, con None en los campos que todavía no
+        # llegaron; el último valor es el resultado final. Apenas están los dos campos se deja
+        # de leer, sin esperar el cierre del JSON ni lo que el modelo agregue después.
+        lector = LectorRespuesta()
+        fragmentos = self.llamar_modelo_streaming(self.plantilla.sistema_json, self.plantilla.usuario(texto))
+        try:
+            for fragmento in fragmentos:
+                if lector.agregar(fragmento) and not lector.completo:
+                    yield lector.categoria, lector.razon
+                if lector.completo:
+                    break
+        except ErrorProveedor:
+            raise
+        except Exception as e:
+            yield "ERROR", str(e)
+            return
+        finally:
+            fragmentos.close()
+        yield validar_resultado(*lector.resultado())
+
+
+# === GEMINI ===
+class BackendGemini(Backend):
+    nombre = "Gemini"
+    etiqueta = "Gemini"
+
+    def __init__(self, api_key, modelo="gemini-2.5-flash", plantilla=None, timeout=60, cache_contexto=False,
+                 ttl_cache=3600, endpoint=None):
+        super().__init__(plantilla)
+        import google.generativeai as genai
+        from google.api_core import exceptions
+
+        if endpoint:
+            # Otro servidor compatible con la API REST de Gemini (proxy o benchmark.py).
+            genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": endpoint})
+        else:
+            genai.configure(api_key=api_key)
+        self.genai = genai
+        self.modelo = modelo
+        self.timeout = timeout
+        # Sin el reintento propio del SDK (hasta 600 s ante un 503): los errores transitorios
+        # llegan enseguida a lotes.ControladorAdaptativo, que los cuenta, espera y reintenta.
+        self.opciones_pedido = {"timeout": timeout, "retry": None}
+        self.cache_contexto = cache_contexto
+        self.ttl_cache = ttl_cache
+        self.clientes = {}
+        self.lock = threading.Lock()
+        self.errores_cuota = (exceptions.ResourceExhausted, exceptions.TooManyRequests)
+        self.errores_transitorios = (
+            exceptions.ServiceUnavailable,
+            exceptions.InternalServerError,
+            exceptions.DeadlineExceeded,
+        )
+        self.errores_contexto = (exceptions.NotFound, exceptions.PermissionDenied)
+
+    def _cliente(self, sistema):
+        # Un GenerativeModel por instrucción de sistema, creado una sola vez. Con
+        # `cache_contexto` las instrucciones se suben como CachedContent y cada llamada solo
+        # envía el texto; si la cuenta o el modelo no lo permiten (p. ej. prompt por debajo
+        # del mínimo de tokens) se usa system_instruction, que Gemini 2.5 igual aprovecha
+        # con su cache implícita de prefijos. El CachedContent vence a los `ttl_cache`
+        # segundos, así que poco antes se crea uno nuevo.
+        with self.lock:
+            cliente, vence = self.clientes.get(sistema, (None, None))
+            if cliente is None or (vence is not None and time.time() >= vence):
+                cliente, vence = None, None
+                if self.cache_contexto:
+                    try:
+                        contenido = self.genai.caching.CachedContent.create(
+                            model=f"models/{self.modelo}",
+                            system_instruction=sistema,
+                            ttl=timedelta(seconds=self.ttl_cache),
+                        )
+                        cliente = self.genai.GenerativeModel.from_cached_content(contenido)
+                        vence = time.time() + max(self.ttl_cache - 60, self.ttl_cache / 2)
+                    except Exception:
+                        cliente = None
+                if cliente is None:
+                    cliente = self.genai.GenerativeModel(self.modelo, system_instruction=sistema)
+                self.clientes[sistema] = (cliente, vence)
+            return cliente
+
+    def _descartar_contexto(self, sistema):
+        # Si el CachedContent ya no existe (venció o se borró) se descarta su cliente y el
+        # reintento crea uno nuevo o usa system_instruction. Devuelve False si `sistema` no
+        # usaba un CachedContent.
+        with self.lock:
+            _, vence = self.clientes.get(sistema, (None, None))
+            if vence is None:
+                return False
+            del self.clientes[sistema]
+            return True
+
+    def llamar_modelo(self, sistema, usuario):
+        try:
+            response = self._cliente(sistema).generate_content(usuario, request_options=self.opciones_pedido)
+        except self.errores_cuota as e:
+            raise ErrorProveedor(str(e), limite_tasa=True, espera=segundos_sugeridos(e)) from e
+        except self.errores_transitorios as e:
+            raise ErrorProveedor(str(e), espera=segundos_sugeridos(e)) from e
+        except self.errores_contexto as e:
+            if not self._descartar_contexto(sistema):
+                raise
+            raise ErrorProveedor(f"Contexto en cache no disponible: {e}") from e
+        uso = getattr(response, "usage_metadata", None)
+        if uso is not None:
+            self.uso.registrar(
+                prompt=uso.prompt_token_count,
+                respuesta=uso.candidates_token_count,
+                en_cache=getattr(uso, "cached_content_token_count", 0),
+            )
+        return response.text.strip()
+
+    def llamar_modelo_streaming(self, sistema, usuario):
+        response = None
+        try:
+            response = self._cliente(sistema).generate_content(
+                usuario,
+                stream=True,
+                generation_config={"response_mime_type": "application/json"},
+                request_options=self.opciones_pedido,
+            )
+            for fragmento in response:
+                if fragmento.parts:
+                    yield fragmento.text
+        except self.errores_cuota as e:
+            raise ErrorProveedor(str(e), limite_tasa=True, espera=segundos_sugeridos(e)) from e
+        except self.errores_transitorios as e:
+            raise ErrorProveedor(str(e), espera=segundos_sugeridos(e)) from e
+        except self.errores_contexto as e:
+            if not self._descartar_contexto(sistema):
+                raise
+            raise ErrorProveedor(f"Contexto en cache no disponible: {e}") from e
+        finally:
+            # Cerrar este generador no cierra el stream de la respuesta: se cancela el
+            # iterador subyacente (gRPC o REST) para que el proveedor deje de generar.
+            iterador = getattr(response, "_iterator", None)
+            cancelar = getattr(iterador, "cancel", None) or getattr(iterador, "close", None)
+            if cancelar is not None:
+                cancelar()
+
+
+# === OLLAMA ===
+class BackendOllama(Backend):
+    nombre = "Ollama"
+    plantilla_predeterminada = "breve"
+    costo_relativo = 1
+    solicitudes_por_minuto = 30
+    tamano_lote = 5
+    trabajadores = 2
+
+    def __init__(self, url="http://localhost:11434", modelo="deepseek-r1:14b", etiqueta="Deepseek",
+                 plantilla=None, timeout=300, reintentos_conexion=2, conexiones=16, keep_alive="30m", pensar=None):
+        super().__init__(plantilla)
+        self.keep_alive = keep_alive
+        # Con False se pide a los modelos de razonamiento que no generen el bloque de
+        # pensamiento (Ollama 0.9 o posterior); con None no se envía la opción.
+        self.pensar = pensar
+        self.url = url.rstrip("/")
+        self.modelo = modelo
+        self.etiqueta = etiqueta
+        self.timeout = timeout
+        # Sesión con conexiones keep-alive compartidas por todos los hilos de clasificación.
+        # urllib3 solo reintenta la conexión; los 429/5xx los maneja ControladorAdaptativo.
+        self.sesion = requests.Session()
+        adaptador = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=conexiones,
+            max_retries=Retry(total=None, connect=reintentos_conexion, read=0, status=0, backoff_factor=0.5),
+        )
+        self.sesion.mount("http://", adaptador)
+        self.sesion.mount("https://", adaptador)
+
+    def _generar(self, sistema, usuario, **opciones):
+        # `system` es igual en todas las llamadas, así Ollama reutiliza el prefijo ya procesado;
+        # `keep_alive` mantiene el modelo cargado entre filas.
+        datos = {
+            "model": self.modelo,
+            "system": sistema,
+            "prompt": usuario,
+            "stream": False,
+            "keep_alive": self.keep_alive,
+            **opciones,
+        }
+        if self.pensar is not None:
+            datos["think"] = self.pensar
+        try:
+            response = self.sesion.post(
+                f"{self.url}/api/generate", json=datos, timeout=self.timeout, stream=datos["stream"]
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise ErrorProveedor(str(e)) from e
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise ErrorProveedor(
+                f"Error {response.status_code}: {response.text}",
+                limite_tasa=response.status_code == 429,
+                espera=segundos_retry_after(response.headers.get("Retry-After")),
+            )
+        if response.status_code != 200:
+            raise RuntimeError(f"Error {response.status_code}: {response.text}")
+        return response
+
+    def _registrar_uso(self, datos):
+        self.uso.registrar(
+            prompt=datos.get("prompt_eval_count"),
+            respuesta=datos.get("eval_count"),
+            segundos_prefill=datos.get("prompt_eval_duration", 0) / 1e9,
+        )
+        # Tiempo de carga, prefill y generación informado por Ollama; el resto es red y cola.
+        anotar(segundos_generacion=datos.get("total_duration", 0) / 1e9)
+
+    def llamar_modelo(self, sistema, usuario):
+        datos = self._generar(sistema, usuario).json()
+        self._registrar_uso(datos)
+        return datos.get("response", "").strip()
+
+    def llamar_modelo_streaming(self, sistema, usuario):
+        # Con `format` Ollama restringe la salida al esquema JSON. Cerrar la respuesta antes
+        # de "done" corta la conexión y Ollama deja de generar.
+        response = self._generar(sistema, usuario, stream=True, format=ESQUEMA_RESPUESTA)
+        try:
+            # Sin chunk_size cada línea se entrega apenas llega, sin esperar a llenar un búfer.
+            for linea in response.iter_lines(chunk_size=None):
+                if not linea:
+                    continue
+                datos = json.loads(linea)
+                if datos.get("error"):
+                    raise RuntimeError(datos["error"])
+                if datos.get("done"):
+                    self._registrar_uso(datos)
+                yield datos.get("response", "")
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise ErrorProveedor(str(e)) from e
+        finally:
+            response.close()
+
+
+# === SIMULADO (PRUEBAS Y DEMOSTRACIONES) ===
+class BackendFalso(Backend):
+    # No consulta ningún modelo: responde con las reglas de reglas.py y REVISAR en el resto,
+    # tras una demora fija. Con `tasa_errores` una fracción de las llamadas falla con un 429
+    # simulado. Sirve para probar la interfaz y el procesamiento por lotes.
+    nombre = "Simulado"
+    etiqueta = "Simulado"
+    modelo = "simulado"
+    costo_relativo = 0
+    solicitudes_por_minuto = 600
+    trabajadores = 8
+
+    def __init__(self, latencia=0.2, tasa_errores=0.0, plantilla=None):
+        super().__init__(plantilla)
+        self.latencia = latencia
+        self.tasa_errores = tasa_errores
+
+    def llamar_modelo(self, sistema, usuario):
+        # Responde en el formato que pide cada instrucción de la plantilla, así el parseo y el
+        # streaming se prueban con el mismo código que usan los modelos reales.
+        time.sleep(self.latencia)
+        if random.random() < self.tasa_errores:
+            raise ErrorProveedor("Error 429: cuota simulada agotada", limite_tasa=True, espera=1.0)
+        numerados = re.findall(r"^\[(\d+)\] (.*)$", usuario, re.MULTILINE)
+        if numerados:
+            return "\n".join(
+                json.dumps({"id": int(i), "tipo": categoria, "razon": razon}, ensure_ascii=False)
+                for (i, _), (categoria, razon) in zip(numerados, self._responder([t for _, t in numerados]))
+            )
+        categoria, razon = self._responder([usuario.split("Texto:", 1)[-1].strip()])[0]
+        if sistema == self.plantilla.sistema_json:
+            return json.dumps({"tipo": categoria, "razon": razon}, ensure_ascii=False)
+        return f"Tipo de Incidente: {categoria}\nRazón: {razon}"
+
+    def _responder(self, textos):
+        resultados = []
+        for categoria, razon in preclasificar(textos).itertuples(index=False):
+            if isinstance(categoria, str):
+                resultados.append((categoria, razon))
+            else:
+                resultados.append(("REVISAR", "Respuesta simulada: ninguna regla coincide."))
+        return resultados
+
+
+# === REGISTRO DE BACKENDS ===
+def backends_disponibles():
+    nombres = ["Gemini", "Ollama"]
+    if os.getenv("HABILITAR_SIMULADO"):
+        nombres.append("Simulado")
+    return nombres
+
+
+def crear_backend(nombre, plantilla=None):
+    # Lanza ValueError si el backend no está configurado. Sin `plantilla` se usa la del backend.
+    if nombre == "Gemini":
+        api_key = os.getenv("GEMINI_API_KEY_2")
+        if not api_key:
+            raise ValueError("API Key no configurada. Definila como variable de entorno GEMINI_API_KEY en Streamlit Cloud.")
+        return BackendGemini(
+            api_key,
+            modelo=os.getenv("GEMINI_MODELO", "gemini-2.5-flash"),
+            plantilla=plantilla,
+            cache_contexto=bool(os.getenv("GEMINI_CACHE_CONTEXTO")),
+            endpoint=os.getenv("GEMINI_ENDPOINT"),
+        )
+    if nombre == "Ollama":
+        return BackendOllama(
+            url=os.getenv("OLLAMA_URL", "http://localhost:11434"),
+            modelo=os.getenv("OLLAMA_MODELO", "deepseek-r1:14b"),
+            plantilla=plantilla,
+            keep_alive=os.getenv("OLLAMA_KEEP_ALIVE", "30m"),
+            pensar={"0": False, "1": True}.get(os.getenv("OLLAMA_PENSAR", "")),
+        )
+    if nombre == "Simulado":
+        return BackendFalso(
+            latencia=float(os.getenv("SIMULADO_LATENCIA", "0.2")),
+            tasa_errores=float(os.getenv("SIMULADO_ERRORES", "0")),
+            plantilla=plantilla,
+        )
+    raise ValueError(f"Backend desconocido: {nombre}")
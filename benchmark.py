@@ -0,0 +1,471 @@
+import argparse
+import json
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from normalizacion import normalizar_texto
+from prompts import DEFINICIONES_COMPLETAS, PLANTILLAS
+from respuestas import CATEGORIAS, categoria_valida
+
+# Tipos de incidente que puede devolver el servidor simulado al equivocarse a propósito.
+TIPOS_INCIDENTE = [c for c in CATEGORIAS if c not in ("REVISAR", "FILA SIN EVENTOS")]
+
+
+# === CORPUS SINTÉTICO ===
+APELLIDOS = ["CORREA", "GUZMÁN", "OLIVA", "CARBONEL", "MARTINEZ", "VEGA", "SOSA", "ROMERO", "BENITEZ", "ACOSTA"]
+CALLES = ["RIVADAVIA", "RUTA 25", "YRIGOYEN", "SARMIENTO", "BELGRANO", "SAN MARTÍN", "MITRE", "LAS HERAS"]
+ESTACIONES = ["VILLA ADELINA", "GRAND BOURG", "BOULOGNE", "PILAR", "SOLDATI", "DEL VISO"]
+
+# Textos que no son incidentes: avisos de otros sectores y novedades del servicio.
+SIN_EVENTOS = [
+    "SR. {apellido}, SEÑALAMIENTO, INFORMA P.A.N. {calle} KM {km} BRAZO DESCENDENTE ROTO. C/A. RESG.",
+    "T. {tren}/E7{loc} SALE DE ESTACIÓN {estacion} CON {minutos} MINUTOS DE DEMORA POR ESPERA DE COMBINACIÓN.",
+    "SIN NOVEDAD EN EL SERVICIO. COND. {apellido} ({legajo}) TOMA SERVICIO EN ESTACIÓN {estacion}.",
+    "CORTE DE ENERGÍA EN ESTACIÓN {estacion}, SE INFORMA A MANTENIMIENTO. SR. {apellido} C/A.",
+]
+
+
+def ejemplos_prompt(definiciones=DEFINICIONES_COMPLETAS):
+    # {categoria: ejemplo} a partir de las líneas "- TIPO:" y "- Ejemplos:" del prompt.
+    ejemplos = {}
+    categoria = None
+    for linea in definiciones.splitlines():
+        encabezado = re.match(r"\s*- ([A-ZÁÉÍÓÚÑ ]+):\s*$", linea)
+        if encabezado:
+            categoria = encabezado.group(1).strip()
+            continue
+        ejemplo = re.match(r"\s*- Ejemplos:\s*(.+)", linea)
+        if ejemplo and categoria:
+            ejemplos[categoria] = ejemplo.group(1).strip()
+    return ejemplos
+
+
+def _variar(texto, azar):
+    # Cambia números y apellidos del ejemplo para obtener textos distintos del mismo tipo.
+    texto = re.sub(r"\d", lambda _: str(azar.randint(0, 9)), texto)
+    return re.sub(r"(COND\. |SR\. )[A-ZÁÉÍÓÚÑ]+", lambda m: m.group(1) + azar.choice(APELLIDOS), texto)
+
+
+def corpus_sintetico(filas=1000, duplicados=0.3, vacias=0.02, sin_eventos=0.2, semilla=0):
+    # DataFrame con columnas Descripcion y Categoria. Una fracción `duplicados` de las filas
+    # repite textos anteriores, como ocurre en los partes reales, y `vacias` queda sin texto.
+    azar = random.Random(semilla)
+    ejemplos = ejemplos_prompt()
+    textos = []
+    categorias = []
+    for _ in range(filas):
+        sorteo = azar.random()
+        if sorteo < vacias:
+            texto, categoria = "", "FILA SIN EVENTOS"
+        elif textos and sorteo < vacias + duplicados:
+            i = azar.randrange(len(textos))
+            texto, categoria = textos[i], categorias[i]
+        elif sorteo < vacias + duplicados + sin_eventos:
+            texto = azar.choice(SIN_EVENTOS).format(
+                apellido=azar.choice(APELLIDOS), calle=azar.choice(CALLES), estacion=azar.choice(ESTACIONES),
+                km=f"{azar.randint(10, 60)}/{azar.randint(0, 999):03d}", tren=azar.randint(3000, 3200),
+                loc=f"{azar.randint(0, 30):02d}", minutos=azar.randint(2, 20), legajo=azar.randint(3000, 3200),
+            )
+            categoria = "FILA SIN EVENTOS"
+        else:
+            categoria = azar.choice(list(ejemplos))
+            texto = _variar(ejemplos[categoria], azar)
+        textos.append(texto)
+        categorias.append(categoria)
+    return pd.DataFrame({"Descripcion": textos, "Categoria": categorias})
+
+
+def leer_etiquetado(ruta, columna, columna_etiqueta):
+    # Devuelve un DataFrame con columnas Descripcion y Categoria a partir de un archivo etiquetado.
+    df = pd.read_csv(ruta) if ruta.endswith(".csv") else pd.read_excel(ruta)
+    for c in (columna, columna_etiqueta):
+        if c not in df.columns:
+            raise ValueError(f"{ruta}: no tiene la columna {c}.")
+    categorias = df[columna_etiqueta].astype(str).map(categoria_valida)
+    return pd.DataFrame({"Descripcion": df[columna], "Categoria": categorias.fillna("REVISAR")})
+
+
+# === SERVIDOR SIMULADO ===
+class ServidorSimulado:
+    # Servidor HTTP local que responde como Ollama (/api/generate) y como la API REST de
+    # Gemini (models/<modelo>:generateContent). Contesta con la categoría conocida de cada
+    # texto (`etiquetas`, clave normalizar_texto) o REVISAR, tras una demora aleatoria y, según
+    # las tasas indicadas, con 429, 503 o una categoría equivocada. Mide el procesamiento por
+    # lotes sin gastar cuota: la exactitud obtenida es la del pipeline, no la del modelo.
+    def __init__(self, etiquetas=None, latencia=0.2, variacion=0.05, latencia_por_texto=0.02,
+                 tasa_limite=0.0, tasa_fallas=0.0, tasa_confusion=0.0, semilla=None):
+        self.etiquetas = etiquetas or {}
+        self.latencia = latencia
+        self.variacion = variacion
+        self.latencia_por_texto = latencia_por_texto
+        self.tasa_limite = tasa_limite
+        self.tasa_fallas = tasa_fallas
+        self.tasa_confusion = tasa_confusion
+        self.azar = random.Random(semilla)
+        self.lock = threading.Lock()
+        self.solicitudes = 0
+        self.limites = 0
+        self.fallas = 0
+        self.servidor = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.servidor.server_port}"
+
+    def iniciar(self):
+        simulado = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # conexiones keep-alive y streaming por chunks, como Ollama
+
+            def do_POST(self):
+                simulado._atender(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.servidor.daemon_threads = True
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        return self.url
+
+    def detener(self):
+        if self.servidor is not None:
+            self.servidor.shutdown()
+            self.servidor.server_close()
+
+    def _sortear(self):
+        with self.lock:
+            self.solicitudes += 1
+            sorteo = self.azar.random()
+            demora = max(0.0, self.azar.gauss(self.latencia, self.variacion))
+            if sorteo < self.tasa_limite:
+                self.limites += 1
+                return "limite", demora
+            if sorteo < self.tasa_limite + self.tasa_fallas:
+                self.fallas += 1
+                return "falla", demora
+            return "ok", demora
+
+    def _categoria(self, texto):
+        categoria = self.etiquetas.get(normalizar_texto(texto), "REVISAR")
+        with self.lock:
+            if self.azar.random() < self.tasa_confusion:
+                return self.azar.choice([c for c in TIPOS_INCIDENTE if c != categoria])
+        return categoria
+
+    def _responder(self, usuario, en_json=False):
+        # Misma forma que piden las plantillas de prompts.py: una línea JSON por descripción
+        # numerada, un objeto JSON (sistema_json) o el par "Tipo de Incidente:/Razón:".
+        numerados = re.findall(r"^\[(\d+)\] (.*)$", usuario, re.MULTILINE)
+        if numerados:
+            lineas = [
+                json.dumps({"id": int(i), "tipo": self._categoria(t), "razon": "Respuesta simulada."}, ensure_ascii=False)
+                for i, t in numerados
+            ]
+            return "\n".join(lineas), len(numerados)
+        texto = usuario.split("Texto:", 1)[-1].strip()
+        if en_json:
+            return json.dumps({"tipo": self._categoria(texto), "razon": "Respuesta simulada."}, ensure_ascii=False), 1
+        return f"Tipo de Incidente: {self._categoria(texto)}\nRazón: Respuesta simulada.", 1
+
+    def _atender(self, pedido):
+        datos = json.loads(pedido.rfile.read(int(pedido.headers.get("Content-Length", 0))) or b"{}")
+        gemini = "enerateContent" in pedido.path
+        if gemini:
+            usuario = "".join(p.get("text", "") for p in datos["contents"][-1]["parts"])
+            sistema = "".join(p.get("text", "") for p in datos.get("systemInstruction", {}).get("parts", []))
+            en_json = datos.get("generationConfig", {}).get("responseMimeType") == "application/json"
+            streaming = ":streamGenerateContent" in pedido.path
+        else:
+            usuario = datos.get("prompt", "")
+            sistema = datos.get("system", "")
+            en_json = "format" in datos
+            streaming = datos.get("stream", True)
+
+        estado, demora = self._sortear()
+        respuesta, cantidad = self._responder(usuario, en_json)
+        if not gemini:
+            respuesta = f"<think>Respuesta simulada.</think>\n{respuesta}"
+        if streaming and estado == "ok":
+            return self._enviar_fragmentos(pedido, respuesta, demora, gemini)
+        time.sleep(demora + self.latencia_por_texto * (cantidad - 1))
+
+        if estado == "limite":
+            mensaje = "Resource has been exhausted. Please retry in 1s"
+            cuerpo = {"error": {"code": 429, "message": mensaje, "status": "RESOURCE_EXHAUSTED"}} if gemini else {"error": mensaje}
+            return self._enviar(pedido, 429, cuerpo, {"Retry-After": "1"})
+        if estado == "falla":
+            mensaje = "The model is overloaded."
+            cuerpo = {"error": {"code": 503, "message": mensaje, "status": "UNAVAILABLE"}} if gemini else {"error": mensaje}
+            return self._enviar(pedido, 503, cuerpo)
+
+        tokens_prompt = (len(sistema) + len(usuario)) // 4
+        tokens_respuesta = len(respuesta) // 4
+        if gemini:
+            cuerpo = {
+                "candidates": [{"content": {"parts": [{"text": respuesta}], "role": "model"}, "finishReason": "STOP", "index": 0}],
+                "usageMetadata": {
+                    "promptTokenCount": tokens_prompt,
+                    "candidatesTokenCount": tokens_respuesta,
+                    "totalTokenCount": tokens_prompt + tokens_respuesta,
+                },
+            }
+        else:
+            cuerpo = {
+                "model": datos.get("model"),
+                "response": respuesta,
+                "done": True,
+                "prompt_eval_count": tokens_prompt,
+                "eval_count": tokens_respuesta,
+                "prompt_eval_duration": int(demora * 1e9),
+                "total_duration": int(demora * 1e9),
+            }
+        self._enviar(pedido, 200, cuerpo)
+
+    def _enviar_fragmentos(self, pedido, respuesta, demora, gemini):
+        # Streaming: NDJSON como Ollama o un arreglo JSON enviado de a un objeto como la API
+        # REST de Gemini, en fragmentos de pocos caracteres repartidos a lo largo de `demora`.
+        # Si el cliente corta, se deja de enviar.
+        fragmentos = [respuesta[i:i + 8] for i in range(0, len(respuesta), 8)]
+        pedido.send_response(200)
+        pedido.send_header("Content-Type", "application/json" if gemini else "application/x-ndjson")
+        pedido.send_header("Transfer-Encoding", "chunked")
+        pedido.end_headers()
+        try:
+            for i, fragmento in enumerate(fragmentos):
+                time.sleep(demora / len(fragmentos))
+                final = i == len(fragmentos) - 1
+                if gemini:
+                    evento = {"candidates": [{"content": {"parts": [{"text": fragmento}], "role": "model"}, "index": 0}]}
+                    linea = ("[" if i == 0 else ",\r\n") + json.dumps(evento, ensure_ascii=False) + ("]" if final else "")
+                else:
+                    evento = {"response": fragmento, "done": final}
+                    if final:
+                        evento.update(eval_count=len(respuesta) // 4, total_duration=int(demora * 1e9))
+                    linea = json.dumps(evento, ensure_ascii=False) + "\n"
+                contenido = linea.encode("utf-8")
+                pedido.wfile.write(f"{len(contenido):X}\r\n".encode() + contenido + b"\r\n")
+                pedido.wfile.flush()
+            pedido.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _enviar(self, pedido, estado, cuerpo, encabezados=None):
+        contenido = json.dumps(cuerpo, ensure_ascii=False).encode("utf-8")
+        pedido.send_response(estado)
+        pedido.send_header("Content-Type", "application/json")
+        pedido.send_header("Content-Length", str(len(contenido)))
+        for nombre, valor in (encabezados or {}).items():
+            pedido.send_header(nombre, valor)
+        pedido.end_headers()
+        pedido.wfile.write(contenido)
+
+
+# === MEDICIONES ===
+def percentiles(duraciones):
+    serie = pd.Series(duraciones, dtype=float)
+    if serie.empty:
+        return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {"p50": serie.quantile(0.5), "p95": serie.quantile(0.95), "max": serie.max()}
+
+
+def histograma(duraciones, barras=10, ancho=40):
+    # Histograma de texto de las latencias, en segundos.
+    if not duraciones:
+        return ""
+    cuentas = pd.cut(pd.Series(duraciones), barras).value_counts(sort=False)
+    maximo = max(cuentas.max(), 1)
+    return "\n".join(
+        f"  {intervalo.left:7.3f}-{intervalo.right:7.3f}s {'#' * round(ancho * cantidad / maximo):<{ancho}} {cantidad}"
+        for intervalo, cantidad in cuentas.items()
+    )
+
+
+def matriz_confusion(reales, predichas):
+    # Filas: categoría esperada; columnas: categoría obtenida.
+    return pd.crosstab(
+        pd.Series(list(reales), name="esperada"), pd.Series(list(predichas), name="obtenida"), margins=True, margins_name="Total"
+    )
+
+
+def exactitud_por_categoria(reales, predichas):
+    datos = pd.DataFrame({"esperada": list(reales), "acierto": [r == p for r, p in zip(reales, predichas)]})
+    return datos.groupby("esperada")["acierto"].agg(["mean", "size"]).rename(columns={"mean": "exactitud", "size": "filas"})
+
+
+# === EJECUCIÓN ===
+def crear_backend_benchmark(nombre, url, plantilla=None):
+    from backends import BackendGemini, BackendOllama, crear_backend
+
+    if url is None:
+        return crear_backend(nombre, plantilla)
+    if nombre == "Gemini":
+        return BackendGemini("simulada", modelo="gemini-simulado", plantilla=plantilla, endpoint=url)
+    return BackendOllama(url=url, modelo="simulado", etiqueta="Simulado", plantilla=plantilla)
+
+
+def ejecutar_pasada(datos, backend, cache, args, modelo_local=None):
+    from lotes import ControladorAdaptativo, clasificar_columna, encadenar_clasificacion
+    from metricas import RegistroEjecucion
+
+    trabajadores = args.trabajadores or backend.trabajadores
+    controlador = ControladorAdaptativo(args.solicitudes_por_minuto or backend.solicitudes_por_minuto, trabajadores)
+    registro = RegistroEjecucion(backend)
+    cache.reiniciar_contadores()
+    backend.uso.reiniciar()
+    # La misma cadena de cache, registro y controlador de tasa que la app y flujo.py.
+    clasificar, clasificar_lote = encadenar_clasificacion(backend, controlador, cache, registro)
+
+    inicio = time.perf_counter()
+    categorias, _, detenido, resumen = clasificar_columna(
+        datos["Descripcion"],
+        clasificar,
+        trabajadores=trabajadores,
+        limite_errores=args.limite_errores,
+        clasificar_lote=clasificar_lote,
+        tamano_lote=args.lote or backend.tamano_lote,
+        usar_reglas=args.reglas,
+        modelo_local=modelo_local,
+        umbral_confianza=args.umbral_confianza,
+    )
+    segundos = time.perf_counter() - inicio
+    duraciones = [evento["latencia"] for evento in registro.llamadas]
+
+    reales = datos["Categoria"].tolist()
+    return {
+        "filas": len(datos),
+        "segundos": segundos,
+        "filas_por_segundo": len(datos) / segundos if segundos else 0.0,
+        "detenido": detenido,
+        "llamadas": len(duraciones),
+        "latencia": percentiles(duraciones),
+        "duraciones": duraciones,
+        "resumen": resumen,
+        "cache": {"aciertos": cache.aciertos, "fallos": cache.fallos},
+        "reintentos": controlador.reintentos_hechos,
+        "avisos_cuota": controlador.limites_recibidos,
+        "errores": sum(c == "ERROR" for c in categorias),
+        "tokens": {"prompt": backend.uso.prompt, "respuesta": backend.uso.respuesta},
+        "exactitud": sum(r == p for r, p in zip(reales, categorias)) / len(reales) if reales else 0.0,
+        "categorias": categorias,
+    }
+
+
+def mostrar_pasada(numero, resultado):
+    resumen = resultado["resumen"]
+    cache = resultado["cache"]
+    consultas = cache["aciertos"] + cache["fallos"]
+    latencia = resultado["latencia"]
+    print(f"\n=== Pasada {numero} ===")
+    print(f"{resultado['filas']} filas en {resultado['segundos']:.2f} s: {resultado['filas_por_segundo']:.1f} filas/s"
+          + (" (detenida por errores consecutivos)" if resultado["detenido"] else ""))
+    print(f"Llamadas al modelo: {resultado['llamadas']}, reintentos: {resultado['reintentos']}, "
+          f"avisos de cuota: {resultado['avisos_cuota']}, filas con ERROR: {resultado['errores']}")
+    print(f"Latencia por llamada: p50 {latencia['p50']:.3f} s, p95 {latencia['p95']:.3f} s, máx. {latencia['max']:.3f} s")
+    print(histograma(resultado["duraciones"]))
+    print(f"Deduplicación: {resumen['unicos']} textos distintos, {resumen['duplicados']} duplicados, "
+          f"{resumen['vacias']} vacías, {resumen['reglas']} por reglas, {resumen['modelo_local']} por el modelo local "
+          f"({resumen['llamadas_evitadas'] / max(1, resumen['filas']):.0%} de las filas sin consultar)")
+    print(f"Cache: {cache['aciertos']} aciertos, {cache['fallos']} fallos "
+          f"({cache['aciertos'] / max(1, consultas):.0%} de aciertos)")
+    print(f"Tokens: {resultado['tokens']['prompt']} de entrada, {resultado['tokens']['respuesta']} de salida")
+    print(f"Exactitud: {resultado['exactitud']:.1%}")
+
+
+# === LÍNEA DE COMANDOS ===
+def main():
+    parser = argparse.ArgumentParser(
+        description="Mide velocidad y exactitud de la clasificación por lotes contra un servidor simulado."
+    )
+    parser.add_argument("--backend", default="Ollama", choices=["Gemini", "Ollama"], help="API que imita el servidor")
+    parser.add_argument("--real", action="store_true", help="Usar el backend configurado en lugar del servidor simulado")
+    parser.add_argument("--etiquetado", help="Archivo .csv o .xlsx con textos y categorías esperadas")
+    parser.add_argument("--columna", default="Descripcion", help="Columna de texto del archivo etiquetado")
+    parser.add_argument("--columna-etiqueta", default="Categoria", help="Columna con la categoría esperada")
+    parser.add_argument("--filas", type=int, default=1000, help="Filas del corpus sintético")
+    parser.add_argument("--duplicados", type=float, default=0.3, help="Fracción de filas repetidas del corpus sintético")
+    parser.add_argument("--guardar-corpus", help="Guardar el corpus usado en este .csv")
+    parser.add_argument("--latencia", type=float, default=0.2, help="Demora media por llamada, en segundos")
+    parser.add_argument("--variacion", type=float, default=0.05, help="Desvío de la demora, en segundos")
+    parser.add_argument("--latencia-por-texto", type=float, default=0.02, help="Demora extra por texto del lote")
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="Fracción de llamadas que responden 429")
+    parser.add_argument("--tasa-fallas", type=float, default=0.0, help="Fracción de llamadas que responden 503")
+    parser.add_argument("--tasa-confusion", type=float, default=0.0, help="Fracción de respuestas con una categoría equivocada")
+    parser.add_argument("--plantilla", choices=list(PLANTILLAS), help="Plantilla de prompt (por defecto, la del backend)")
+    parser.add_argument("--solicitudes-por-minuto", type=int, default=6000)
+    parser.add_argument("--trabajadores", type=int, default=None)
+    parser.add_argument("--lote", type=int, default=None, help="Incidentes por solicitud")
+    parser.add_argument("--limite-errores", type=int, default=20)
+    parser.add_argument("--reglas", action="store_true", help="Resolver por reglas los casos evidentes")
+    parser.add_argument("--modelo-local", help="Ruta de un modelo local entrenado (ver modelo_local.py)")
+    parser.add_argument("--umbral-confianza", type=float, default=0.9)
+    parser.add_argument("--pasadas", type=int, default=2, help="La segunda pasada y siguientes miden la cache")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--json", help="Guardar las métricas en este archivo para comparar corridas")
+    args = parser.parse_args()
+    if args.pasadas < 1:
+        parser.error("--pasadas debe ser al menos 1")
+
+    from cache import CacheClasificaciones
+    from modelo_local import ClasificadorLocal
+
+    if args.etiquetado:
+        datos = leer_etiquetado(args.etiquetado, args.columna, args.columna_etiqueta)
+    else:
+        datos = corpus_sintetico(args.filas, args.duplicados, semilla=args.semilla)
+    if args.guardar_corpus:
+        datos.to_csv(args.guardar_corpus, index=False)
+
+    servidor = None
+    if not args.real:
+        etiquetas = {
+            normalizar_texto(t): c for t, c in zip(datos["Descripcion"], datos["Categoria"]) if isinstance(t, str)
+        }
+        servidor = ServidorSimulado(
+            etiquetas, args.latencia, args.variacion, args.latencia_por_texto,
+            args.tasa_429, args.tasa_fallas, args.tasa_confusion, semilla=args.semilla,
+        )
+        servidor.iniciar()
+    modelo_local = ClasificadorLocal.cargar(args.modelo_local) if args.modelo_local else None
+
+    resultados = []
+    try:
+        backend = crear_backend_benchmark(args.backend, servidor.url if servidor else None, args.plantilla)
+        with tempfile.TemporaryDirectory() as carpeta:
+            # Cache nueva en cada corrida: la primera pasada parte vacía.
+            cache = CacheClasificaciones(os.path.join(carpeta, "cache.sqlite"))
+            for numero in range(1, args.pasadas + 1):
+                resultado = ejecutar_pasada(datos, backend, cache, args, modelo_local)
+                mostrar_pasada(numero, resultado)
+                resultados.append(resultado)
+            cache.conexion.close()
+    finally:
+        if servidor is not None:
+            servidor.detener()
+
+    print("\n=== Matriz de confusión (primera pasada) ===")
+    reales = datos["Categoria"].tolist()
+    print(matriz_confusion(reales, resultados[0]["categorias"]).to_string())
+    print("\n" + exactitud_por_categoria(reales, resultados[0]["categorias"]).to_string(float_format="{:.1%}".format))
+    if servidor is not None:
+        print(f"\nServidor simulado: {servidor.solicitudes} solicitudes, {servidor.limites} respuestas 429, "
+              f"{servidor.fallas} respuestas 503")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                [{k: v for k, v in r.items() if k not in ("categorias", "duraciones")} for r in resultados],
+                f, ensure_ascii=False, indent=2,
+            )
+
+
+if __name__ == "__main__":
+    main()
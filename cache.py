@@ -0,0 +1,126 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+from normalizacion import normalizar_texto
+from respuestas import categoria_valida
+
+
+# === CACHE PERSISTENTE DE CLASIFICACIONES ===
+class CacheClasificaciones:
+    # Guarda en SQLite el resultado de cada texto ya clasificado, indexado por un hash del
+    # texto normalizado, el modelo y la versión del prompt. Solo se guardan tipos de incidente
+    # de la lista, con su nombre oficial. Cuando se superan `max_entradas` se eliminan las
+    # menos usadas recientemente (LRU).
+    def __init__(self, ruta="cache_clasificaciones.sqlite", max_entradas=200000):
+        self.max_entradas = max_entradas
+        self.aciertos = 0
+        self.fallos = 0
+        self.lock = threading.Lock()
+        self.conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self.conexion.execute("PRAGMA journal_mode=WAL")
+        self.conexion.execute(
+            """CREATE TABLE IF NOT EXISTS clasificaciones (
+                clave TEXT PRIMARY KEY,
+                categoria TEXT NOT NULL,
+                razon TEXT NOT NULL,
+                ultimo_uso REAL NOT NULL
+            )"""
+        )
+        self.conexion.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ultimo_uso ON clasificaciones (ultimo_uso)"
+        )
+        self.conexion.commit()
+        self.cantidad = self.conexion.execute("SELECT COUNT(*) FROM clasificaciones").fetchone()[0]
+
+    @staticmethod
+    def clave(texto, modelo, version_prompt):
+        base = f"{modelo}\x1f{version_prompt}\x1f{normalizar_texto(texto)}"
+        return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+    def obtener(self, texto, modelo, version_prompt):
+        clave = self.clave(texto, modelo, version_prompt)
+        with self.lock:
+            fila = self.conexion.execute(
+                "SELECT categoria, razon FROM clasificaciones WHERE clave = ?", (clave,)
+            ).fetchone()
+            # Las entradas con un tipo fuera de la lista (guardadas por versiones anteriores)
+            # cuentan como fallo y se reemplazan con la nueva respuesta.
+            if fila is None or categoria_valida(fila[0]) is None:
+                self.fallos += 1
+                return None
+            self.aciertos += 1
+            self.conexion.execute(
+                "UPDATE clasificaciones SET ultimo_uso = ? WHERE clave = ?", (time.time(), clave)
+            )
+            self.conexion.commit()
+            return categoria_valida(fila[0]), fila[1]
+
+    def guardar(self, texto, modelo, version_prompt, categoria, razon):
+        # ERROR, las respuestas vacías y los tipos desconocidos no se guardan.
+        categoria = categoria_valida(categoria or "")
+        if categoria is None:
+            return
+        clave = self.clave(texto, modelo, version_prompt)
+        with self.lock:
+            existe = self.conexion.execute(
+                "SELECT 1 FROM clasificaciones WHERE clave = ?", (clave,)
+            ).fetchone()
+            if existe is None:
+                self.cantidad += 1
+            self.conexion.execute(
+                "INSERT OR REPLACE INTO clasificaciones (clave, categoria, razon, ultimo_uso) VALUES (?, ?, ?, ?)",
+                (clave, categoria, razon, time.time()),
+            )
+            self._desalojar()
+            self.conexion.commit()
+
+    def _desalojar(self):
+        excedente = self.cantidad - self.max_entradas
+        if excedente > 0:
+            # Se libera un 10% extra para no desalojar en cada inserción.
+            excedente = min(self.cantidad, excedente + self.max_entradas // 10)
+            self.cantidad -= excedente
+            self.conexion.execute(
+                "DELETE FROM clasificaciones WHERE clave IN "
+                "(SELECT clave FROM clasificaciones ORDER BY ultimo_uso LIMIT ?)",
+                (excedente,),
+            )
+
+    def envolver(self, clasificar, modelo, version_prompt):
+        # Devuelve una función con la misma firma que `clasificar` que consulta la cache
+        # antes de llamar al modelo. Los errores y las respuestas vacías no se guardan.
+        def clasificar_con_cache(texto):
+            guardado = self.obtener(texto, modelo, version_prompt)
+            if guardado is not None:
+                return guardado
+            categoria, razon = clasificar(texto)
+            self.guardar(texto, modelo, version_prompt, categoria, razon)
+            return categoria, razon
+
+        return clasificar_con_cache
+
+    def envolver_lote(self, clasificar_lote, modelo, version_prompt):
+        # Igual que `envolver` pero para funciones que clasifican una lista de textos:
+        # solo se envían al modelo los textos que no están en la cache.
+        def clasificar_lote_con_cache(textos):
+            resultados = [self.obtener(texto, modelo, version_prompt) for texto in textos]
+            pendientes = [i for i, resultado in enumerate(resultados) if resultado is None]
+            if pendientes:
+                nuevos = clasificar_lote([textos[i] for i in pendientes])
+                for i, nuevo in zip(pendientes, nuevos):
+                    resultados[i] = nuevo
+                    if nuevo is not None:
+                        self.guardar(textos[i], modelo, version_prompt, *nuevo)
+            return resultados
+
+        return clasificar_lote_con_cache
+
+    def reiniciar_contadores(self):
+        with self.lock:
+            self.aciertos = 0
+            self.fallos = 0
+
+    def entradas(self):
+        return self.cantidad
@@ -0,0 +1,93 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from respuestas import categoria_valida
+
+# Resultados que no alcanzan: en cascada pasan al modelo siguiente y en la votación no suman.
+A_ESCALAR = {"REVISAR", "ERROR"}
+
+
+# === CASCADA: PRIMERO EL MODELO MÁS BARATO ===
+def ordenar_por_costo(backends):
+    # La cascada empieza por el backend de menor costo_relativo (el local) y termina en el más caro.
+    return sorted(backends, key=lambda backend: backend.costo_relativo)
+
+
+def necesita_escalar(categoria):
+    # Las filas todavía sin clasificar ("") no se escalan: esperan a su etapa.
+    if not categoria:
+        return False
+    return categoria in A_ESCALAR or categoria_valida(categoria) is None
+
+
+def filas_a_escalar(etapas, textos=None, modelo_local=None, umbral_desacuerdo=0.8):
+    # `etapas` son las columnas de categorías de las etapas ya hechas, de la más barata a la
+    # más cara ("" donde la etapa no clasificó la fila). Se escala la fila cuyo último
+    # resultado es REVISAR, ERROR o un tipo desconocido y, con `modelo_local`, también la que
+    # el modelo local clasifica distinto con confianza de al menos `umbral_desacuerdo`.
+    actuales = [next((c for c in reversed(columna) if c), "") for columna in zip(*etapas)]
+    escalar = {i for i, categoria in enumerate(actuales) if necesita_escalar(categoria)}
+    if modelo_local is not None and textos is not None:
+        dudosas = [i for i, categoria in enumerate(actuales) if categoria and i not in escalar]
+        predichas, confianzas = modelo_local.predecir([textos[i] for i in dudosas])
+        for i, predicha, confianza in zip(dudosas, predichas, confianzas):
+            if confianza >= umbral_desacuerdo and predicha != categoria_valida(actuales[i]):
+                escalar.add(i)
+    return sorted(escalar)
+
+
+def combinar_cascada(etapas):
+    # `etapas` es una lista de (categorias, razones) de la más barata a la más cara. Vale el
+    # resultado de la última etapa que respondió sin ERROR. El acuerdo es "k/n": cuántos de
+    # los n modelos consultados en la fila coinciden con la categoría final.
+    categorias, razones, acuerdos = [], [], []
+    for fila in zip(*(zip(c, r) for c, r in etapas)):
+        consultados = [(c, r) for c, r in fila if c]
+        validos = [(c, r) for c, r in consultados if c != "ERROR"]
+        categoria, razon = (validos or consultados or [("", "")])[-1]
+        categorias.append(categoria)
+        razones.append(razon)
+        acuerdos.append(_acuerdo(categoria, [c for c, _ in consultados]))
+    return categorias, razones, acuerdos
+
+
+# === VOTACIÓN ENTRE MODELOS ===
+def votar(modelos):
+    # `modelos` es una lista de (categorias, razones), del modelo de mayor prioridad al de
+    # menor. Gana la categoría con más votos; REVISAR, ERROR y los tipos desconocidos no
+    # votan, y un empate se resuelve a favor del modelo de mayor prioridad. Sin votos
+    # válidos queda REVISAR, o ERROR si todos fallaron.
+    categorias, razones, acuerdos = [], [], []
+    for fila in zip(*(zip(c, r) for c, r in modelos)):
+        consultados = [(c, r) for c, r in fila if c]
+        votos = Counter(categoria_valida(c) for c, _ in consultados if c not in A_ESCALAR and categoria_valida(c))
+        if votos:
+            maximo = max(votos.values())
+            categoria, razon = next(
+                (categoria_valida(c), r) for c, r in consultados if votos.get(categoria_valida(c)) == maximo
+            )
+        elif consultados and all(c == "ERROR" for c, _ in consultados):
+            categoria, razon = consultados[0]
+        elif consultados:
+            categoria, razon = "REVISAR", "Ningún modelo dio un tipo de incidente."
+        else:
+            categoria, razon = "", ""
+        categorias.append(categoria)
+        razones.append(razon)
+        acuerdos.append(_acuerdo(categoria, [c for c, _ in consultados]))
+    return categorias, razones, acuerdos
+
+
+def _acuerdo(categoria, consultadas):
+    if not consultadas:
+        return ""
+    coincidencias = sum(1 for c in consultadas if (categoria_valida(c) or c) == (categoria_valida(categoria) or categoria))
+    return f"{coincidencias}/{len(consultadas)}"
+
+
+def ejecutar_en_conjunto(tareas):
+    # Corre a la vez las clasificaciones de varios modelos; `tareas` es {etiqueta: función
+    # sin argumentos}. Cada modelo conserva su propio controlador de tasa y sus trabajadores.
+    with ThreadPoolExecutor(max_workers=max(1, len(tareas))) as ejecutor:
+        futuros = {etiqueta: ejecutor.submit(tarea) for etiqueta, tarea in tareas.items()}
+        return {etiqueta: futuro.result() for etiqueta, futuro in futuros.items()}
@@ -0,0 +1,221 @@
+import argparse
+import os
+from itertools import islice
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_DISPONIBLE = True
+except ImportError:
+    PARQUET_DISPONIBLE = False
+
+
+# === LECTURA POR BLOQUES ===
+def _nombres_columnas(encabezado):
+    return [str(c) if c is not None else f"Unnamed: {i}" for i, c in enumerate(encabezado)]
+
+
+def columnas_archivo(ruta):
+    # Lee solo el encabezado del archivo.
+    if ruta.endswith(".csv"):
+        return pd.read_csv(ruta, nrows=0).columns.tolist()
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        encabezado = next(libro.active.iter_rows(max_row=1, values_only=True), ())
+    finally:
+        libro.close()
+    return _nombres_columnas(encabezado)
+
+
+def leer_por_bloques(ruta, tamano_bloque=5000, columnas=None):
+    # Devuelve DataFrames de hasta `tamano_bloque` filas sin cargar el archivo completo.
+    # Con `columnas` se leen solo esas columnas.
+    if ruta.endswith(".csv"):
+        yield from pd.read_csv(ruta, chunksize=tamano_bloque, usecols=columnas)
+        return
+
+    from openpyxl import load_workbook
+
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        encabezado = _nombres_columnas(next(filas, ()))
+        posiciones = list(range(len(encabezado)))
+        if columnas is not None:
+            posiciones = [encabezado.index(c) for c in columnas]
+        nombres = [encabezado[p] for p in posiciones]
+        while True:
+            bloque = list(islice(filas, tamano_bloque))
+            if not bloque:
+                break
+            yield pd.DataFrame(
+                [[fila[p] if p < len(fila) else None for p in posiciones] for fila in bloque],
+                columns=nombres,
+            )
+    finally:
+        libro.close()
+
+
+# === ESCRITURA INCREMENTAL ===
+class EscritorCSV:
+    def __init__(self, ruta):
+        self.archivo = open(ruta, "w", encoding="utf-8", newline="")
+        self.encabezado = True
+
+    def escribir(self, bloque):
+        bloque.to_csv(self.archivo, index=False, header=self.encabezado)
+        self.encabezado = False
+        self.archivo.flush()
+
+    def cerrar(self):
+        self.archivo.close()
+
+
+class EscritorExcel:
+    # openpyxl en modo write_only vuelca las filas a disco a medida que se agregan.
+    def __init__(self, ruta):
+        from openpyxl import Workbook
+
+        self.ruta = ruta
+        self.libro = Workbook(write_only=True)
+        self.hoja = self.libro.create_sheet()
+        self.encabezado = True
+
+    def escribir(self, bloque):
+        if self.encabezado:
+            self.hoja.append([str(c) for c in bloque.columns])
+            self.encabezado = False
+        for fila in bloque.itertuples(index=False):
+            self.hoja.append([None if pd.isna(valor) else valor for valor in fila])
+
+    def cerrar(self):
+        self.libro.save(self.ruta)
+
+
+class EscritorParquet:
+    # Todas las columnas se guardan como texto para que el esquema no cambie entre bloques.
+    def __init__(self, ruta):
+        if not PARQUET_DISPONIBLE:
+            raise RuntimeError("Instalá pyarrow para escribir archivos Parquet.")
+        self.ruta = ruta
+        self.escritor = None
+
+    def escribir(self, bloque):
+        bloque = bloque.astype(object).where(bloque.notna(), None).astype("string")
+        tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+        if self.escritor is None:
+            self.escritor = pq.ParquetWriter(self.ruta, tabla.schema)
+        self.escritor.write_table(tabla)
+
+    def cerrar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+
+
+ESCRITORES = {"csv": EscritorCSV, "xlsx": EscritorExcel, "parquet": EscritorParquet}
+
+
+def crear_escritor(ruta):
+    extension = ruta.rsplit(".", 1)[-1].lower()
+    if extension not in ESCRITORES:
+        raise ValueError(f"Formato de salida no soportado: {extension}")
+    return ESCRITORES[extension](ruta)
+
+
+# === CLASIFICACIÓN POR BLOQUES ===
+def clasificar_por_bloques(ruta_entrada, ruta_salida, columna, clasificadores, tamano_bloque=5000,
+                           solo_columna=False, al_terminar_bloque=None):
+    # Lee `ruta_entrada` por bloques, agrega a cada bloque las columnas devueltas por cada
+    # `clasificadores[etiqueta](serie) -> (categorias, razones, detenido)` y lo escribe enseguida
+    # en `ruta_salida`. La memoria usada depende del tamaño del bloque, no del archivo.
+    # `al_terminar_bloque(filas_hechas)` se llama después de escribir cada bloque.
+    # Devuelve (filas_hechas, detenido): si un clasificador se detuvo por errores consecutivos,
+    # ese bloque no se escribe y no se leen los siguientes; la salida queda incompleta.
+    columnas = [columna] if solo_columna else None
+    escritor = crear_escritor(ruta_salida)
+    filas_hechas = 0
+    try:
+        for bloque in leer_por_bloques(ruta_entrada, tamano_bloque, columnas):
+            for etiqueta, clasificar_serie in clasificadores.items():
+                categorias, razones, detenido = clasificar_serie(bloque[columna])
+                if detenido:
+                    return filas_hechas, True
+                bloque[f"Clasificacion-{etiqueta}"] = categorias
+                bloque[f"Razon-{etiqueta}"] = razones
+            escritor.escribir(bloque)
+            filas_hechas += len(bloque)
+            if al_terminar_bloque is not None:
+                al_terminar_bloque(filas_hechas)
+    finally:
+        escritor.cerrar()
+    return filas_hechas, False
+
+
+# === LÍNEA DE COMANDOS ===
+def main():
+    from backends import crear_backend
+    from cache import CacheClasificaciones
+    from lotes import ControladorAdaptativo, clasificar_columna, encadenar_clasificacion
+    from metricas import RegistroEjecucion, iniciar_servidor_metricas
+    from prompts import PLANTILLAS
+
+    parser = argparse.ArgumentParser(description="Clasifica un archivo grande por bloques.")
+    parser.add_argument("entrada", help="Archivo .csv o .xlsx")
+    parser.add_argument("salida", help="Archivo de salida .csv, .xlsx o .parquet")
+    parser.add_argument("--columna", required=True, help="Columna con los posibles incidentes")
+    parser.add_argument("--backend", default="Ollama", choices=["Gemini", "Ollama", "Simulado"])
+    parser.add_argument("--plantilla", choices=list(PLANTILLAS), help="Plantilla de prompt (por defecto, la del backend)")
+    parser.add_argument("--bloque", type=int, default=5000, help="Filas por bloque")
+    parser.add_argument("--solicitudes-por-minuto", type=int, default=None)
+    parser.add_argument("--trabajadores", type=int, default=None)
+    parser.add_argument("--lote", type=int, default=None, help="Incidentes por solicitud")
+    parser.add_argument("--registro", help="Guardar en este .jsonl la medición de cada llamada al modelo")
+    parser.add_argument("--sin-reglas", action="store_true", help="Enviar todas las filas al modelo, sin resolver por reglas")
+    parser.add_argument("--solo-columna", action="store_true", help="No copiar las demás columnas a la salida")
+    args = parser.parse_args()
+
+    backend = crear_backend(args.backend, args.plantilla)
+    cache = CacheClasificaciones(os.getenv("CACHE_CLASIFICACIONES", "cache_clasificaciones.sqlite"))
+    trabajadores = args.trabajadores or backend.trabajadores
+    controlador = ControladorAdaptativo(args.solicitudes_por_minuto or backend.solicitudes_por_minuto, trabajadores)
+    registro = RegistroEjecucion(backend, args.registro)
+    if os.getenv("METRICAS_PUERTO"):
+        iniciar_servidor_metricas(int(os.getenv("METRICAS_PUERTO")))
+    clasificar, clasificar_lote = encadenar_clasificacion(backend, controlador, cache, registro)
+
+    def clasificar_serie(serie):
+        categorias, razones, detenido, _ = clasificar_columna(
+            serie,
+            clasificar,
+            trabajadores=trabajadores,
+            clasificar_lote=clasificar_lote,
+            tamano_lote=args.lote or backend.tamano_lote,
+            usar_reglas=not args.sin_reglas,
+        )
+        return categorias, razones, detenido
+
+    filas, detenido = clasificar_por_bloques(
+        args.entrada,
+        args.salida,
+        args.columna,
+        {backend.etiqueta: clasificar_serie},
+        tamano_bloque=args.bloque,
+        solo_columna=args.solo_columna,
+        al_terminar_bloque=lambda hechas: print(
+            f"{hechas} filas clasificadas ({registro.resumen(hechas)['por_segundo']:.1f} filas/s)", flush=True
+        ),
+    )
+    if detenido:
+        raise SystemExit(f"Clasificación detenida por errores consecutivos: {args.salida} tiene solo las primeras {filas} filas")
+    print(f"Listo: {filas} filas en {args.salida} (cache: {cache.aciertos} aciertos, {cache.fallos} fallos)")
+    if backend.uso.llamadas:
+        print(f"Tokens: {backend.uso.prompt} de entrada, {backend.uso.respuesta} de salida, "
+              f"{backend.uso.en_cache} desde cache del proveedor")
+
+
+if __name__ == "__main__":
+    main()
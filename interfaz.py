@@ -0,0 +1,608 @@
+import hashlib
+import os
+import shutil
+import time
+from functools import partial
+from io import BytesIO
+
+import pandas as pd
+import streamlit as st
+
+from backends import ErrorProveedor, backends_disponibles, crear_backend
+from cache import CacheClasificaciones
+from cascada import combinar_cascada, ejecutar_en_conjunto, filas_a_escalar, ordenar_por_costo, votar
+from flujo import PARQUET_DISPONIBLE, clasificar_por_bloques, columnas_archivo
+from lotes import ControladorAdaptativo, clasificar_columna, encadenar_clasificacion
+from metricas import RegistroEjecucion, iniciar_servidor_metricas
+from prompts import PLANTILLAS
+from modelo_local import RUTA_MODELO, SKLEARN_DISPONIBLE, ClasificadorLocal, leer_etiquetados
+from respuestas import categoria_valida
+from trabajos import DIRECTORIO_TRABAJOS, Trabajo, columnas_resultado, filas_pendientes
+
+MIME_SALIDA = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+# === RECURSOS COMPARTIDOS ENTRE RERUNS ===
+@st.cache_resource
+def obtener_backend(nombre, plantilla=None):
+    return crear_backend(nombre, plantilla)
+
+
+@st.cache_resource
+def obtener_controlador(nombre):
+    # Uno por backend: el ritmo aprendido tras un 429 se conserva entre corridas.
+    backend = obtener_backend(nombre)
+    return ControladorAdaptativo(backend.solicitudes_por_minuto, backend.trabajadores)
+
+
+@st.cache_resource
+def obtener_cache():
+    return CacheClasificaciones(os.getenv("CACHE_CLASIFICACIONES", "cache_clasificaciones.sqlite"))
+
+
+@st.cache_resource
+def obtener_servidor_metricas(puerto):
+    # Un solo servidor /metrics por proceso, aunque haya varias sesiones abiertas.
+    return iniciar_servidor_metricas(puerto)
+
+
+@st.cache_resource
+def obtener_modelo_local(ruta, modificado):
+    # `modificado` invalida el recurso cuando se vuelve a entrenar el modelo.
+    return ClasificadorLocal.cargar(ruta)
+
+
+def seleccionar_backends(predeterminado):
+    nombres = backends_disponibles()
+    elegidos = st.sidebar.multiselect(
+        "🤖 Modelos", nombres, default=[predeterminado] if predeterminado in nombres else nombres[:1]
+    )
+    if not elegidos:
+        st.warning("Elegí al menos un modelo en la barra lateral.")
+        st.stop()
+
+    # Sin elegir, cada modelo usa su plantilla: la completa para Gemini y la breve para Ollama.
+    plantilla = st.sidebar.selectbox(
+        "📝 Plantilla de prompt", ["Según el modelo"] + list(PLANTILLAS),
+        help="La compacta usa menos tokens por solicitud. Cambiarla invalida la cache de clasificaciones.",
+    )
+    plantilla = None if plantilla == "Según el modelo" else plantilla
+
+    backends = []
+    for nombre in elegidos:
+        try:
+            backends.append(obtener_backend(nombre, plantilla))
+        except ValueError as e:
+            st.error(f"❌ {e}")
+            st.stop()
+    return backends
+
+
+# === MODO 1: CLASIFICACIÓN MANUAL ===
+def clasificar_en_vivo(backend, cache, texto, categoria_vista, razon_vista):
+    # Muestra cada campo apenas el modelo lo genera. La respuesta se pide en JSON y la
+    # generación se corta al tener los dos campos; ante un error del proveedor se vuelve a
+    # la llamada normal con reintentos.
+    guardada = cache.obtener(texto, backend.modelo, backend.version_prompt)
+    if guardada is not None:
+        return guardada
+    categoria, razon = None, None
+    try:
+        for categoria, razon in backend.clasificar_streaming(texto):
+            if categoria is not None and categoria_valida(categoria):
+                categoria_vista.write(f"**📌 Categoría:** {categoria_valida(categoria)}")
+            if razon is not None:
+                razon_vista.write(f"**💬 Razón:** {razon}")
+    except ErrorProveedor:
+        controlador = obtener_controlador(backend.nombre)
+        return controlador.envolver(backend.clasificar)(texto)
+    # El último resultado ya viene validado: un tipo fuera de la lista llega como ERROR.
+    if categoria != "ERROR":
+        cache.guardar(texto, backend.modelo, backend.version_prompt, categoria, razon)
+    return categoria, razon
+
+
+def mostrar_modo_manual(backends, cache):
+    texto = st.text_area("✏️ Ingresá un texto", height=200)
+    en_vivo = st.checkbox(
+        "⚡ Mostrar la respuesta a medida que se genera", value=True,
+        help="Pide la respuesta en JSON y deja de generar apenas llegan la categoría y la razón.",
+    )
+
+    if st.button("📊 Clasificar"):
+        if not texto.strip():
+            st.warning("Ingresá un texto antes de clasificar.")
+            return
+        for backend in backends:
+            if len(backends) > 1:
+                st.subheader(backend.nombre)
+            inicio = time.perf_counter()
+            aviso = st.empty()
+            if en_vivo:
+                categoria_vista = st.empty()
+                razon_vista = st.empty()
+                with st.spinner("Clasificando..."):
+                    categoria, razon = clasificar_en_vivo(backend, cache, texto, categoria_vista, razon_vista)
+                categoria_vista.empty()
+                razon_vista.empty()
+            else:
+                controlador = obtener_controlador(backend.nombre)
+                clasificar = cache.envolver(
+                    controlador.envolver(backend.clasificar), backend.modelo, backend.version_prompt
+                )
+                with st.spinner("Clasificando..."):
+                    categoria, razon = clasificar(texto)
+            if categoria == "ERROR":
+                aviso.error(f"❌ Error: {razon}")
+            else:
+                aviso.success("✅ Clasificación exitosa")
+                st.write(f"**📌 Categoría:** {categoria}")
+                st.write(f"**💬 Razón:** {razon}")
+            st.caption(f"⏱ {time.perf_counter() - inicio:.1f} s")
+
+
+# === OPCIONES COMUNES DEL MODO ARCHIVO ===
+LIMITE_ERRORES = 20
+
+
+def mostrar_limites(backend):
+    # Límites de un backend; cada uno arranca con los valores predeterminados de su clase.
+    return {
+        "solicitudes_por_minuto": st.slider(
+            "⏱ Máximo de solicitudes por minuto", 1, 600, backend.solicitudes_por_minuto,
+            help="Se reduce automáticamente si el proveedor responde 429 o cuota agotada.",
+            key=f"solicitudes_por_minuto-{backend.etiqueta}",
+        ),
+        "tamano_lote": st.slider(
+            "📦 Incidentes por solicitud", 1, 50, backend.tamano_lote, key=f"tamano_lote-{backend.etiqueta}"
+        ),
+        "trabajadores": st.slider(
+            "🧵 Clasificaciones simultáneas", 1, 16, backend.trabajadores, key=f"trabajadores-{backend.etiqueta}"
+        ),
+    }
+
+
+def mostrar_opciones(backends):
+    # Controles compartidos por la clasificación normal y la clasificación por bloques. Con
+    # varios modelos (cascada o votación) cada uno tiene sus propios límites.
+    if len(backends) == 1:
+        limites = {backends[0].etiqueta: mostrar_limites(backends[0])}
+    else:
+        limites = {}
+        for backend in backends:
+            with st.expander(f"⚙️ Límites de {backend.nombre}"):
+                limites[backend.etiqueta] = mostrar_limites(backend)
+    opciones = {
+        "limites": limites,
+        "usar_reglas": st.checkbox("⚡ Resolver por reglas los casos evidentes sin consultar al modelo", value=True),
+        "modelo_local": None,
+        "umbral_confianza": 1.0,
+    }
+    if SKLEARN_DISPONIBLE and os.path.exists(RUTA_MODELO):
+        if st.checkbox("🧠 Resolver con el modelo local los casos de alta confianza", value=True):
+            opciones["umbral_confianza"] = st.slider("Confianza mínima del modelo local", 0.5, 1.0, 0.9, 0.01)
+            opciones["modelo_local"] = obtener_modelo_local(RUTA_MODELO, os.path.getmtime(RUTA_MODELO))
+    return opciones
+
+
+def preparar_clasificacion(backend, cache, opciones, registro):
+    # Devuelve los argumentos de clasificar_columna para `backend`, con sus propios límites
+    # y la cadena de lotes.encadenar_clasificacion.
+    limites = opciones["limites"][backend.etiqueta]
+    controlador = obtener_controlador(backend.nombre)
+    controlador.configurar(limites["solicitudes_por_minuto"], limites["trabajadores"])
+    controlador.reiniciar_contadores()
+    backend.uso.reiniciar()
+    clasificar, clasificar_lote = encadenar_clasificacion(backend, controlador, cache, registro)
+    return {
+        "clasificar": clasificar,
+        "clasificar_lote": clasificar_lote,
+        "trabajadores": limites["trabajadores"],
+        "limite_errores": LIMITE_ERRORES,
+        "tamano_lote": limites["tamano_lote"],
+        "usar_reglas": opciones["usar_reglas"],
+        "modelo_local": opciones["modelo_local"],
+        "umbral_confianza": opciones["umbral_confianza"],
+    }
+
+
+def mostrar_ritmo(backend):
+    controlador = obtener_controlador(backend.nombre)
+    st.caption(
+        f"🚦 {backend.nombre}: {controlador.llamadas} llamadas, {controlador.reintentos_hechos} reintentos, "
+        f"{controlador.limites_recibidos} avisos de cuota (429); ritmo actual {controlador.por_minuto:.0f} "
+        f"solicitudes/min con {controlador.concurrencia} simultáneas"
+    )
+    uso = backend.uso
+    if uso.llamadas:
+        prompt, respuesta = uso.por_llamada()
+        st.caption(
+            f"🔤 Tokens (plantilla {backend.plantilla.nombre}): {uso.prompt} de entrada, {uso.respuesta} de salida, "
+            f"{uso.en_cache} desde cache del proveedor; {prompt:.0f} de entrada por solicitud"
+        )
+
+
+def mostrar_metricas(contenedor, registro, hechas=0, total=None):
+    # Panel en vivo de la corrida: se actualiza en el mismo lugar con cada avance.
+    metricas = registro.resumen(hechas, total)
+    with contenedor.container():
+        ritmo, restante, errores, latencia = st.columns(4)
+        ritmo.metric("Textos por segundo", f"{metricas['por_segundo']:.2f}")
+        restante.metric(
+            "Tiempo restante", "—" if metricas["restante"] is None else f"{metricas['restante'] / 60:.1f} min"
+        )
+        errores.metric("Llamadas con error", f"{metricas['tasa_errores']:.0%}")
+        latencia.metric("Latencia p50 / p95", f"{metricas['p50']:.1f} / {metricas['p95']:.1f} s")
+        if metricas["latencia"]:
+            proporcion = {
+                clave: metricas[clave] / metricas["latencia"]
+                for clave in ("espera", "segundos_llamada", "segundos_parseo")
+            }
+            st.caption(
+                f"⏱ {metricas['llamadas']} llamadas: {proporcion['espera']:.0%} del tiempo en espera de cuota y "
+                f"reintentos ({metricas['reintentos']:.0f}), {proporcion['segundos_llamada']:.0%} en red y modelo, "
+                f"{proporcion['segundos_parseo']:.1%} en parseo; {metricas['tokens_prompt']:.0f} tokens de entrada y "
+                f"{metricas['tokens_respuesta']:.0f} de salida"
+            )
+
+
+def mostrar_registro(ruta, nombre_base, clave):
+    if os.path.exists(ruta):
+        with open(ruta, "rb") as f:
+            st.download_button(
+                label="⬇️ Descargar registro de la ejecución (JSONL)",
+                data=f,
+                file_name=f"{nombre_base}_registro.jsonl",
+                mime="application/jsonl",
+                key=clave,
+            )
+
+
+def mostrar_resumen(resumen, cache):
+    st.caption(
+        f"🧮 {resumen['unicos']} textos distintos en {resumen['filas']} filas: "
+        f"se evitaron {resumen['llamadas_evitadas']} llamadas "
+        f"({resumen['duplicados']} duplicados, {resumen['vacias']} vacías, "
+        f"{resumen['reglas']} resueltos por reglas, {resumen['modelo_local']} por el modelo local)"
+    )
+    st.caption(
+        f"🗃️ Cache: {cache.aciertos} aciertos, {cache.fallos} fallos "
+        f"({cache.entradas()} textos guardados)"
+    )
+
+
+# === MODO 2: CLASIFICACIÓN POR ARCHIVO ===
+def mostrar_modo_archivo(backends, cache):
+    archivo = st.file_uploader("📁 Subí un archivo Excel (.xlsx) o CSV (.csv)", type=["xlsx", "csv"])
+    if not archivo:
+        return
+
+    if st.checkbox("🐘 Archivo grande: leer y escribir por bloques"):
+        mostrar_modo_por_bloques(archivo, backends, cache)
+        return
+
+    if archivo.name.endswith(".csv"):
+        df = pd.read_csv(archivo)
+    else:
+        df = pd.read_excel(archivo)
+
+    st.write("✅ Archivo cargado. Columnas:")
+    st.write(df.columns.tolist())
+
+    columna = st.selectbox("Seleccioná la columna con los posibles incidentes:", df.columns)
+    combinacion = "Columnas separadas"
+    if len(backends) > 1:
+        combinacion = st.radio(
+            "🔀 Con varios modelos", ["Columnas separadas", "Cascada", "Votación"], horizontal=True,
+            help="Cascada: todas las filas van primero al modelo más barato y solo las REVISAR, ERROR o "
+                 "dudosas pasan al siguiente. Votación: todos los modelos clasifican a la vez y gana la mayoría.",
+        )
+    if combinacion == "Cascada":
+        backends = ordenar_por_costo(backends)
+        st.caption("Orden de la cascada: " + " → ".join(backend.nombre for backend in backends))
+    opciones = mostrar_opciones(backends)
+
+    total = len(df)
+    trabajos = {backend.etiqueta: Trabajo.para_archivo(archivo.getvalue(), columna, backend) for backend in backends}
+    for backend in backends:
+        resultados = trabajos[backend.etiqueta].resultados()
+        if resultados:
+            errores = sum(1 for estado, _, _ in resultados.values() if estado == "ERROR")
+            st.info(
+                f"💾 {backend.nombre}: avance guardado con {len(resultados)} de {total} filas clasificadas "
+                f"({errores} con ERROR). Al clasificar se continúa desde ahí."
+            )
+
+    boton_clasificar, boton_reintentar, boton_descartar = st.columns(3)
+    clasificar_archivo = boton_clasificar.button("🚀 Clasificar archivo")
+    reintentar_errores = boton_reintentar.button("🔁 Reintentar filas con ERROR")
+    if boton_descartar.button("🗑️ Descartar avance guardado"):
+        for trabajo in trabajos.values():
+            trabajo.descartar()
+        st.rerun()
+
+    textos = df[columna].astype(str).tolist()
+
+    def filas_de_etapa(etapa, resultados):
+        # En cascada cada etapa recibe solo las filas que las etapas anteriores no resolvieron.
+        filas = filas_pendientes(resultados, total, reintentar_errores=reintentar_errores)
+        if combinacion != "Cascada" or etapa == 0:
+            return filas
+        anteriores = [columnas_resultado(trabajos[b.etiqueta].resultados(), total)[0] for b in backends[:etapa]]
+        escalar = set(filas_a_escalar(anteriores, textos, opciones["modelo_local"], opciones["umbral_confianza"]))
+        return [i for i in filas if i in escalar]
+
+    def preparar_trabajo(backend, filas):
+        # Devuelve los argumentos de clasificar_columna que guardan cada resultado en el trabajo.
+        trabajo = trabajos[backend.etiqueta]
+        trabajo.iniciar(
+            archivo=archivo.name, columna=str(columna), backend=backend.nombre, modelo=backend.modelo, filas=total
+        )
+        registro = RegistroEjecucion(backend, os.path.join(trabajo.ruta, "registro.jsonl"))
+
+        def al_clasificar(registros):
+            # Las posiciones son relativas a las filas pendientes; se guardan con su fila original.
+            registros = [(filas[k], categoria, razon) for k, categoria, razon in registros]
+            trabajo.registrar(registros)
+            registro.registrar_filas(registros)
+
+        return registro, {"al_clasificar": al_clasificar, **preparar_clasificacion(backend, cache, opciones, registro)}
+
+    def mostrar_final(backend, detenido, resumen):
+        if detenido:
+            st.error(
+                f"❌ {backend.nombre}: se detectaron {LIMITE_ERRORES} errores consecutivos. Se detiene la "
+                "clasificación; el avance quedó guardado."
+            )
+        mostrar_resumen(resumen, cache)
+        mostrar_ritmo(backend)
+
+    a_ejecutar = clasificar_archivo or reintentar_errores
+    if a_ejecutar and combinacion == "Votación":
+        # Todos los modelos clasifican a la vez las mismas filas, cada uno con su ritmo.
+        cache.reiniciar_contadores()
+        tareas, registros = {}, {}
+        for backend in backends:
+            filas = filas_de_etapa(0, trabajos[backend.etiqueta].resultados())
+            if not filas:
+                st.caption(f"{backend.nombre}: no hay filas pendientes.")
+                continue
+            registros[backend.etiqueta], argumentos = preparar_trabajo(backend, filas)
+            tareas[backend.etiqueta] = partial(clasificar_columna, df[columna].iloc[filas], **argumentos)
+        with st.spinner(f"Clasificando con {len(tareas)} modelos a la vez..."):
+            terminados = ejecutar_en_conjunto(tareas)
+        for backend in backends:
+            if backend.etiqueta in terminados:
+                _, _, detenido, resumen = terminados[backend.etiqueta]
+                st.subheader(backend.nombre)
+                mostrar_metricas(st.empty(), registros[backend.etiqueta], resumen["unicos"], resumen["unicos"])
+                mostrar_final(backend, detenido, resumen)
+
+    for etapa, backend in enumerate(backends if a_ejecutar and combinacion != "Votación" else []):
+        filas = filas_de_etapa(etapa, trabajos[backend.etiqueta].resultados())
+        if not filas:
+            st.caption(f"{backend.nombre}: no hay filas pendientes.")
+            continue
+        if combinacion == "Cascada" and etapa > 0:
+            st.caption(f"🔀 {len(filas)} filas sin resolver pasan a {backend.nombre}.")
+
+        progreso = st.progress(0)
+        estado = st.empty()
+        panel = st.empty()
+        registro, argumentos = preparar_trabajo(backend, filas)
+        actualizado = [0.0]
+
+        def al_avanzar(hechas, total):
+            estado.text(f"{backend.nombre}: clasificados {hechas} de {total} textos distintos...")
+            progreso.progress(hechas / total)
+            # El panel se redibuja como mucho dos veces por segundo.
+            if time.monotonic() - actualizado[0] >= 0.5 or hechas == total:
+                actualizado[0] = time.monotonic()
+                mostrar_metricas(panel, registro, hechas, total)
+
+        cache.reiniciar_contadores()
+        _, _, detenido, resumen = clasificar_columna(df[columna].iloc[filas], al_avanzar=al_avanzar, **argumentos)
+        progreso.progress(1.0)
+        mostrar_metricas(panel, registro, len(filas), len(filas))
+        mostrar_final(backend, detenido, resumen)
+        if detenido and combinacion == "Cascada":
+            break
+
+    # El resultado (completo o parcial) se arma siempre desde el avance guardado.
+    sin_clasificar = 0
+    hay_avance = False
+    columnas = []
+    for etapa, backend in enumerate(backends):
+        resultados = trabajos[backend.etiqueta].resultados()
+        hay_avance = hay_avance or bool(resultados)
+        sin_clasificar = max(sin_clasificar, len(filas_de_etapa(etapa, resultados)) if combinacion == "Cascada"
+                             else total - len(resultados))
+        categorias, razones = columnas_resultado(resultados, total)
+        columnas.append((categorias, razones))
+        df[f"Clasificacion-{backend.etiqueta}"] = categorias
+        df[f"Razon-{backend.etiqueta}"] = razones
+
+    if combinacion != "Columnas separadas":
+        # En la votación el primer modelo elegido desempata; en cascada vale la última etapa.
+        combinar = combinar_cascada if combinacion == "Cascada" else votar
+        df["Clasificacion-Final"], df["Razon-Final"], df["Acuerdo"] = combinar(columnas)
+
+    if not hay_avance:
+        return
+
+    # Descargar resultado
+    salida = BytesIO()
+    df.to_excel(salida, index=False)
+    salida.seek(0)
+
+    nombre_base = archivo.name.rsplit(".", 1)[0]
+    if sin_clasificar:
+        nombre_resultado = f"{nombre_base}_clasificado_parcial.xlsx"
+        st.warning(f"⏸️ Resultado parcial: quedan {sin_clasificar} filas sin clasificar.")
+    else:
+        nombre_resultado = f"{nombre_base}_clasificado.xlsx"
+        st.success("✅ Clasificación completada")
+
+    st.download_button(
+        label="⬇️ Descargar archivo clasificado",
+        data=salida,
+        file_name=nombre_resultado,
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+    for backend in backends:
+        trabajo = trabajos[backend.etiqueta]
+        mostrar_registro(
+            os.path.join(trabajo.ruta, "registro.jsonl"), f"{nombre_base}_{backend.etiqueta}", trabajo.identificador
+        )
+
+
+# === MODO 2B: ARCHIVOS GRANDES POR BLOQUES ===
+def carpeta_por_bloques(carpeta_archivo, columna, backends, solo_columna):
+    # Una corrida con otra columna, otros modelos, otra versión del prompt u otras columnas
+    # de salida no reutiliza los resultados de la anterior.
+    huella = hashlib.sha256()
+    for parte in (str(columna), str(solo_columna)):
+        huella.update(b"\x1f" + parte.encode("utf-8"))
+    for backend in backends:
+        for parte in (backend.etiqueta, backend.modelo, backend.version_prompt):
+            huella.update(b"\x1f" + parte.encode("utf-8"))
+    return os.path.join(carpeta_archivo, huella.hexdigest()[:16])
+
+
+def mostrar_modo_por_bloques(archivo, backends, cache):
+    # El archivo se copia a disco y se procesa de a bloques: solo un bloque está en memoria
+    # y cada bloque clasificado se agrega enseguida al archivo de salida.
+    extension = archivo.name.rsplit(".", 1)[-1].lower()
+    huella = hashlib.sha256(archivo.getvalue()).hexdigest()[:16]
+    carpeta_archivo = os.path.join(DIRECTORIO_TRABAJOS, f"bloques-{huella}")
+    os.makedirs(carpeta_archivo, exist_ok=True)
+    ruta_entrada = os.path.join(carpeta_archivo, f"entrada.{extension}")
+    if not os.path.exists(ruta_entrada):
+        archivo.seek(0)
+        with open(ruta_entrada, "wb") as f:
+            shutil.copyfileobj(archivo, f)
+
+    columna = st.selectbox("Seleccioná la columna con los posibles incidentes:", columnas_archivo(ruta_entrada))
+    formato = st.selectbox("Formato de salida", ["csv", "xlsx"] + (["parquet"] if PARQUET_DISPONIBLE else []))
+    tamano_bloque = st.number_input("Filas por bloque", min_value=100, max_value=100000, value=5000, step=500)
+    solo_columna = st.checkbox("Incluir en la salida solo la columna seleccionada")
+    opciones = mostrar_opciones(backends)
+
+    carpeta = carpeta_por_bloques(carpeta_archivo, columna, backends, solo_columna)
+    os.makedirs(carpeta, exist_ok=True)
+    # Los bloques se escriben en `ruta_parcial` y el archivo pasa a `ruta_salida` recién
+    # cuando está completo; si la corrida se corta queda solo el parcial.
+    ruta_salida = os.path.join(carpeta, f"salida.{formato}")
+    ruta_parcial = os.path.join(carpeta, f"parcial.{formato}")
+
+    if st.button("🚀 Clasificar archivo"):
+        for ruta in (ruta_salida, ruta_parcial):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        cache.reiniciar_contadores()
+        estado = st.empty()
+        paneles = {backend.etiqueta: st.empty() for backend in backends}
+        registros = {
+            backend.etiqueta: RegistroEjecucion(backend, os.path.join(carpeta, f"registro-{backend.etiqueta}.jsonl"))
+            for backend in backends
+        }
+
+        def al_terminar_bloque(hechas):
+            estado.text(f"Clasificadas y guardadas {hechas} filas...")
+            for etiqueta, registro in registros.items():
+                mostrar_metricas(paneles[etiqueta], registro, hechas)
+
+        def clasificador_para(backend):
+            argumentos = preparar_clasificacion(backend, cache, opciones, registros[backend.etiqueta])
+
+            def clasificar_serie(serie):
+                categorias, razones, detenido, _ = clasificar_columna(serie, **argumentos)
+                return categorias, razones, detenido
+
+            return clasificar_serie
+
+        filas, detenido = clasificar_por_bloques(
+            ruta_entrada,
+            ruta_parcial,
+            columna,
+            {backend.etiqueta: clasificador_para(backend) for backend in backends},
+            tamano_bloque=int(tamano_bloque),
+            solo_columna=solo_columna,
+            al_terminar_bloque=al_terminar_bloque,
+        )
+        if not detenido:
+            os.replace(ruta_parcial, ruta_salida)
+        st.caption(f"🗃️ Cache: {cache.aciertos} aciertos, {cache.fallos} fallos ({cache.entradas()} textos guardados)")
+        for backend in backends:
+            mostrar_ritmo(backend)
+        if detenido:
+            st.error(
+                f"❌ Se detectaron {LIMITE_ERRORES} errores consecutivos. Se detiene la clasificación; "
+                f"quedaron guardadas {filas} filas."
+            )
+        else:
+            st.success(f"✅ Clasificación completada: {filas} filas")
+
+    terminado = os.path.exists(ruta_salida)
+    if not terminado and not os.path.exists(ruta_parcial):
+        return
+    if not terminado:
+        st.warning("⏸️ La última clasificación no terminó: el archivo contiene solo los bloques ya guardados.")
+
+    nombre_base = archivo.name.rsplit(".", 1)[0]
+    sufijo = "clasificado" if terminado else "clasificado_parcial"
+    with open(ruta_salida if terminado else ruta_parcial, "rb") as f:
+        st.download_button(
+            label="⬇️ Descargar archivo clasificado",
+            data=f,
+            file_name=f"{nombre_base}_{sufijo}.{formato}",
+            mime=MIME_SALIDA[formato],
+        )
+    for backend in backends:
+        mostrar_registro(
+            os.path.join(carpeta, f"registro-{backend.etiqueta}.jsonl"), f"{nombre_base}_{backend.etiqueta}",
+            f"registro-bloques-{backend.etiqueta}",
+        )
+
+
+# === ENTRENAMIENTO DEL MODELO LOCAL ===
+def mostrar_entrenamiento():
+    with st.sidebar.expander("🧠 Entrenar modelo local"):
+        if not SKLEARN_DISPONIBLE:
+            st.info("Instalá scikit-learn para entrenar el modelo local.")
+            return
+        etiquetados = st.file_uploader(
+            "Archivos ya clasificados (_clasificado.xlsx)", type=["xlsx", "csv"], accept_multiple_files=True
+        )
+        if etiquetados and st.button("Entrenar"):
+            try:
+                with st.spinner("Entrenando..."):
+                    datos = leer_etiquetados(etiquetados)
+                    ClasificadorLocal.entrenar(datos["texto"], datos["categoria"]).guardar(RUTA_MODELO)
+                st.success(f"✅ Modelo entrenado con {len(datos)} textos.")
+            except ValueError as e:
+                st.error(f"❌ {e}")
+
+
+# === INTERFAZ STREAMLIT ===
+def mostrar_app(backend_predeterminado):
+    st.set_page_config(page_title="Clasificador de Incidentes", layout="centered")
+    st.title("🧾 Clasificador de Incidentes Ferroviarios")
+
+    backends = seleccionar_backends(backend_predeterminado)
+    cache = obtener_cache()
+    if os.getenv("METRICAS_PUERTO"):
+        obtener_servidor_metricas(int(os.getenv("METRICAS_PUERTO")))
+
+    modo = st.radio("¿Qué querés hacer?", ["📝 Clasificar un incidente manualmente", "📂 Clasificar archivo Excel/CSV"])
+
+    if modo == "📝 Clasificar un incidente manualmente":
+        mostrar_modo_manual(backends, cache)
+    else:
+        mostrar_modo_archivo(backends, cache)
+
+    mostrar_entrenamiento()
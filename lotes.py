@@ -0,0 +1,405 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from backends import ErrorProveedor
+from metricas import anotar
+from normalizacion import normalizar_texto
+from reglas import preclasificar
+
+
+# === LIMITADOR DE TASA (TOKEN BUCKET) ===
+class LimitadorTasa:
+    # Permite hasta `por_minuto` solicitudes por minuto, con ráfagas de hasta `rafaga`.
+    # Reemplaza la espera fija entre filas: cada trabajador toma una ficha antes de llamar al modelo.
+    def __init__(self, por_minuto, rafaga=1):
+        self.tasa = por_minuto / 60.0
+        self.capacidad = max(1, rafaga)
+        self.fichas = float(self.capacidad)
+        self.ultimo = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _recargar(self):
+        ahora = time.monotonic()
+        self.fichas = min(self.capacidad, self.fichas + (ahora - self.ultimo) * self.tasa)
+        self.ultimo = ahora
+
+    def adquirir(self):
+        while True:
+            with self.lock:
+                self._recargar()
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                faltante = (1 - self.fichas) / self.tasa
+            time.sleep(faltante)
+
+    def ajustar(self, por_minuto):
+        with self.lock:
+            self._recargar()
+            self.tasa = por_minuto / 60.0
+
+
+# === CONTROL ADAPTATIVO DE TASA Y REINTENTOS ===
+class ControladorAdaptativo:
+    # Ajusta el ritmo según las respuestas del proveedor (AIMD): ante un 429 o cuota agotada
+    # reduce a la mitad las solicitudes por minuto y la concurrencia, y pausa todas las
+    # llamadas el tiempo que sugiera el proveedor; con cada éxito vuelve a subir de a poco
+    # hasta los máximos configurados. Los ErrorProveedor se reintentan con espera
+    # exponencial con jitter. Se crea uno por backend y se reutiliza entre corridas.
+    def __init__(self, por_minuto, concurrencia, reintentos=4, espera_base=1.0, espera_maxima=60.0,
+                 minimo_por_minuto=1):
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.minimo_por_minuto = minimo_por_minuto
+        self.condicion = threading.Condition()
+        self.en_curso = 0
+        self.pausa_hasta = 0.0
+        self.ultimo_limite = 0.0
+        self.exitos_seguidos = 0
+        self.maximo_por_minuto = por_minuto
+        self.maxima_concurrencia = concurrencia
+        self.por_minuto = por_minuto
+        self.concurrencia = concurrencia
+        self.limitador = LimitadorTasa(por_minuto, rafaga=concurrencia)
+        self.reiniciar_contadores()
+
+    def configurar(self, por_minuto, concurrencia):
+        # Fija los máximos elegidos en la interfaz. Si hubo un 429 en los últimos minutos se
+        # conserva el ritmo aprendido; si no, se parte del máximo.
+        with self.condicion:
+            self.maximo_por_minuto = por_minuto
+            self.maxima_concurrencia = concurrencia
+            reciente = time.monotonic() - self.ultimo_limite < 300
+            self.por_minuto = min(self.por_minuto, por_minuto) if reciente else por_minuto
+            self.concurrencia = min(self.concurrencia, concurrencia) if reciente else concurrencia
+            self.limitador.capacidad = max(1, concurrencia)
+            self.limitador.ajustar(self.por_minuto)
+            self.condicion.notify_all()
+
+    def reiniciar_contadores(self):
+        self.llamadas = 0
+        self.reintentos_hechos = 0
+        self.limites_recibidos = 0
+        self.fallas_definitivas = 0
+
+    def _entrar(self):
+        while True:
+            with self.condicion:
+                espera = self.pausa_hasta - time.monotonic()
+                if espera <= 0 and self.en_curso < self.concurrencia:
+                    self.en_curso += 1
+                    self.llamadas += 1
+                    return
+                self.condicion.wait(timeout=espera if espera > 0 else None)
+
+    def _salir(self):
+        with self.condicion:
+            self.en_curso -= 1
+            self.condicion.notify_all()
+
+    def _exito(self):
+        with self.condicion:
+            self.exitos_seguidos += 1
+            self.por_minuto = min(self.maximo_por_minuto, self.por_minuto + max(1.0, self.maximo_por_minuto * 0.05))
+            if self.exitos_seguidos % 10 == 0:
+                self.concurrencia = min(self.maxima_concurrencia, self.concurrencia + 1)
+            self.limitador.ajustar(self.por_minuto)
+            self.condicion.notify_all()
+
+    def _falla(self, error):
+        with self.condicion:
+            self.exitos_seguidos = 0
+            if error.limite_tasa:
+                self.limites_recibidos += 1
+                self.ultimo_limite = time.monotonic()
+                self.por_minuto = max(self.minimo_por_minuto, self.por_minuto / 2)
+                self.concurrencia = max(1, self.concurrencia // 2)
+                if error.espera:
+                    self.pausa_hasta = max(self.pausa_hasta, time.monotonic() + error.espera)
+            else:
+                self.por_minuto = max(self.minimo_por_minuto, self.por_minuto * 0.8)
+            self.limitador.ajustar(self.por_minuto)
+
+    def _espera_reintento(self, intento, error):
+        espera = min(self.espera_maxima, self.espera_base * 2 ** intento) * random.uniform(0.5, 1.5)
+        if error.espera:
+            espera = max(espera, error.espera + random.uniform(0, 1))
+        return espera
+
+    def llamar(self, funcion, argumento, al_fallar):
+        for intento in range(self.reintentos + 1):
+            inicio = time.monotonic()
+            self._entrar()
+            self.limitador.adquirir()
+            anotar(espera=time.monotonic() - inicio)
+            try:
+                resultado = funcion(argumento)
+            except ErrorProveedor as e:
+                self._salir()
+                self._falla(e)
+                anotar(limites=1 if e.limite_tasa else 0)
+                with self.condicion:
+                    if intento == self.reintentos:
+                        self.fallas_definitivas += 1
+                    else:
+                        self.reintentos_hechos += 1
+                if intento == self.reintentos:
+                    anotar(error=type(e).__name__)
+                    return al_fallar(e, argumento)
+                espera = self._espera_reintento(intento, e)
+                anotar(reintentos=1, espera=espera)
+                time.sleep(espera)
+                continue
+            self._salir()
+            self._exito()
+            return resultado
+
+    def envolver(self, clasificar):
+        def clasificar_controlado(texto):
+            return self.llamar(clasificar, texto, lambda e, _: ("ERROR", str(e)))
+
+        return clasificar_controlado
+
+    def envolver_lote(self, clasificar_lote):
+        def clasificar_lote_controlado(textos):
+            return self.llamar(clasificar_lote, textos, lambda e, grupo: [("ERROR", str(e))] * len(grupo))
+
+        return clasificar_lote_controlado
+
+
+def encadenar_clasificacion(backend, controlador, cache, registro):
+    # Devuelve (clasificar, clasificar_lote) de `backend` con la misma cadena en la app, la
+    # línea de comandos y benchmark.py: la cache se consulta antes del controlador de tasa
+    # para que los aciertos no consuman cuota, y `registro` (metricas.RegistroEjecucion)
+    # mide solo las llamadas que llegan al modelo, con su espera y sus reintentos.
+    clasificar = cache.envolver(
+        registro.envolver(controlador.envolver(backend.clasificar)), backend.modelo, backend.version_prompt
+    )
+    clasificar_lote = cache.envolver_lote(
+        registro.envolver_lote(controlador.envolver_lote(backend.clasificar_lote)), backend.modelo, backend.version_prompt
+    )
+    return clasificar, clasificar_lote
+
+
+# === CLASIFICACIÓN CONCURRENTE ===
+def _resultado_valido(categoria, razon):
+    if categoria == "ERROR":
+        razon = razon or "Error sin mensaje"
+    return categoria, razon
+
+
+def _clasificar_uno(clasificar, texto):
+    try:
+        categoria, razon = clasificar(texto)
+    except Exception as e:
+        return "ERROR", str(e)
+    return _resultado_valido(categoria, razon)
+
+
+def _clasificar_grupo(textos, clasificar, clasificar_lote):
+    # Envía varios textos en una sola solicitud. Los textos que el modelo no devolvió o
+    # devolvió mal formados (None) se vuelven a pedir de a uno.
+    if clasificar_lote is None or len(textos) == 1:
+        return [_clasificar_uno(clasificar, texto) for texto in textos]
+    try:
+        resultados = list(clasificar_lote(textos))
+    except Exception as e:
+        return [("ERROR", str(e))] * len(textos)
+    if len(resultados) != len(textos):
+        resultados = [None] * len(textos)
+    return [
+        _clasificar_uno(clasificar, texto) if resultado is None else _resultado_valido(*resultado)
+        for texto, resultado in zip(textos, resultados)
+    ]
+
+
+def clasificar_en_paralelo(textos, clasificar, trabajadores=4, al_avanzar=None, limite_errores=20,
+                           clasificar_lote=None, tamano_lote=1, al_resultado=None):
+    # Clasifica `textos` con hasta `trabajadores` llamadas simultáneas y devuelve
+    # (categorias, razones, detenido) con los resultados en el orden de las filas originales.
+    # Con `clasificar_lote` se envían hasta `tamano_lote` textos por solicitud.
+    # `al_avanzar(hechas, total)` y `al_resultado(indices, categorias, razones)` se llaman desde
+    # el hilo principal (seguro para Streamlit) cada vez que termina una solicitud.
+    # Si se acumulan `limite_errores` errores consecutivos se cancelan las filas pendientes.
+    textos = list(textos)
+    total = len(textos)
+    categorias = [None] * total
+    razones = [None] * total
+    detenido = threading.Event()
+    if clasificar_lote is None:
+        tamano_lote = 1
+    tamano_lote = max(1, tamano_lote)
+
+    def tarea(inicio):
+        if detenido.is_set():
+            return None
+        return _clasificar_grupo(textos[inicio:inicio + tamano_lote], clasificar, clasificar_lote)
+
+    errores_consecutivos = 0
+    hechas = 0
+    with ThreadPoolExecutor(max_workers=max(1, trabajadores)) as ejecutor:
+        futuros = {ejecutor.submit(tarea, inicio): inicio for inicio in range(0, total, tamano_lote)}
+        try:
+            for futuro in as_completed(futuros):
+                if futuro.cancelled():
+                    continue
+                resultados = futuro.result()
+                if resultados is None:
+                    continue
+                inicio = futuros[futuro]
+                for i, (categoria, razon) in enumerate(resultados, start=inicio):
+                    categorias[i], razones[i] = categoria, razon
+                    hechas += 1
+                    if categoria == "ERROR":
+                        errores_consecutivos += 1
+                    else:
+                        errores_consecutivos = 0
+
+                if al_resultado is not None:
+                    al_resultado(
+                        range(inicio, inicio + len(resultados)),
+                        [categoria for categoria, _ in resultados],
+                        [razon for _, razon in resultados],
+                    )
+                if al_avanzar is not None:
+                    al_avanzar(hechas, total)
+
+                if errores_consecutivos >= limite_errores and not detenido.is_set():
+                    detenido.set()
+                    for pendiente in futuros:
+                        pendiente.cancel()
+        except BaseException:
+            # Si un callback corta la ejecución (p. ej. un rerun o stop de Streamlit), se
+            # cancelan las filas pendientes en vez de esperarlas al salir del `with`.
+            detenido.set()
+            ejecutor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    for i in range(total):
+        if categorias[i] is None:
+            categorias[i] = "ERROR"
+            razones[i] = "No procesada: clasificación detenida por errores consecutivos"
+
+    return categorias, razones, detenido.is_set()
+
+
+# === DEDUPLICACIÓN PREVIA AL ENVÍO ===
+FILA_VACIA = ("FILA SIN EVENTOS", "Celda vacía: no se consultó al modelo")
+
+
+def es_vacio(valor):
+    if valor is None:
+        return True
+    try:
+        if pd.isna(valor):
+            return True
+    except (TypeError, ValueError):
+        pass
+    return str(valor).strip().lower() in ("", "nan", "none", "nat")
+
+
+def deduplicar(valores):
+    # Agrupa los valores por texto normalizado. Devuelve los textos únicos (el primero de
+    # cada grupo), los índices de filas de cada grupo y los índices de las filas vacías.
+    unicos = []
+    grupos = []
+    vacias = []
+    posicion = {}
+    for i, valor in enumerate(valores):
+        if es_vacio(valor):
+            vacias.append(i)
+            continue
+        clave = normalizar_texto(valor)
+        if clave not in posicion:
+            posicion[clave] = len(unicos)
+            unicos.append(str(valor))
+            grupos.append([])
+        grupos[posicion[clave]].append(i)
+    return unicos, grupos, vacias
+
+
+def clasificar_columna(valores, clasificar, trabajadores=4, al_avanzar=None, limite_errores=20,
+                       clasificar_lote=None, tamano_lote=1, usar_reglas=False,
+                       modelo_local=None, umbral_confianza=0.8, al_clasificar=None):
+    # Clasifica una columna completa consultando al modelo una sola vez por texto distinto.
+    # Las filas vacías o NaN no se envían y, con `usar_reglas`, tampoco las que las reglas
+    # resuelven sin ambigüedad. Con `modelo_local` (ver modelo_local.py) solo llegan al modelo
+    # los textos cuya predicción local tiene confianza menor a `umbral_confianza`.
+    # `al_clasificar(registros)` recibe listas de (fila, categoria, razon) a medida que se
+    # resuelven, para guardar el avance (ver trabajos.py). Devuelve (categorias, razones, detenido, resumen), donde
+    # `resumen` indica cuántas llamadas se evitaron.
+    valores = list(valores)
+    unicos, grupos, vacias = deduplicar(valores)
+    categorias_unicas = [None] * len(unicos)
+    razones_unicas = [None] * len(unicos)
+
+    if usar_reglas and unicos:
+        por_reglas = preclasificar(pd.Series(unicos))
+        for j, (categoria, razon) in enumerate(por_reglas.itertuples(index=False)):
+            if not pd.isna(categoria):
+                categorias_unicas[j], razones_unicas[j] = categoria, razon
+    pendientes = [j for j, categoria in enumerate(categorias_unicas) if categoria is None]
+
+    resueltos_local = 0
+    if modelo_local is not None and pendientes:
+        predichas, confianzas = modelo_local.predecir([unicos[j] for j in pendientes])
+        for j, categoria, confianza in zip(pendientes, predichas, confianzas):
+            if confianza >= umbral_confianza:
+                categorias_unicas[j] = categoria
+                razones_unicas[j] = f"Clasificado por el modelo local (confianza {confianza:.0%})."
+                resueltos_local += 1
+        pendientes = [j for j in pendientes if categorias_unicas[j] is None]
+
+    def registrar(indices_unicos, categorias_grupo, razones_grupo):
+        if al_clasificar is None:
+            return
+        registros = [
+            (fila, categoria, razon)
+            for j, categoria, razon in zip(indices_unicos, categorias_grupo, razones_grupo)
+            for fila in grupos[j]
+        ]
+        al_clasificar(registros)
+
+    if al_clasificar is not None:
+        al_clasificar([(i, *FILA_VACIA) for i in vacias])
+    resueltos = [j for j, categoria in enumerate(categorias_unicas) if categoria is not None]
+    registrar(resueltos, [categorias_unicas[j] for j in resueltos], [razones_unicas[j] for j in resueltos])
+
+    def al_resultado(indices, categorias_grupo, razones_grupo):
+        registrar([pendientes[k] for k in indices], categorias_grupo, razones_grupo)
+
+    categorias_modelo, razones_modelo, detenido = clasificar_en_paralelo(
+        [unicos[j] for j in pendientes], clasificar, trabajadores=trabajadores,
+        al_avanzar=al_avanzar, limite_errores=limite_errores,
+        clasificar_lote=clasificar_lote, tamano_lote=tamano_lote,
+        al_resultado=al_resultado,
+    )
+    for j, categoria, razon in zip(pendientes, categorias_modelo, razones_modelo):
+        categorias_unicas[j], razones_unicas[j] = categoria, razon
+
+    categorias = [None] * len(valores)
+    razones = [None] * len(valores)
+    for filas, categoria, razon in zip(grupos, categorias_unicas, razones_unicas):
+        for i in filas:
+            categorias[i] = categoria
+            razones[i] = razon
+    for i in vacias:
+        categorias[i], razones[i] = FILA_VACIA
+
+    resumen = {
+        "filas": len(valores),
+        "unicos": len(unicos),
+        "vacias": len(vacias),
+        "duplicados": len(valores) - len(unicos) - len(vacias),
+        "reglas": len(unicos) - len(pendientes) - resueltos_local,
+        "modelo_local": resueltos_local,
+    }
+    resumen["llamadas_evitadas"] = (
+        resumen["vacias"] + resumen["duplicados"] + resumen["reglas"] + resumen["modelo_local"]
+    )
+    return categorias, razones, detenido, resumen
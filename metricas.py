@@ -0,0 +1,211 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# === MEDICIÓN DE LA LLAMADA EN CURSO ===
+# Cada llamada al modelo corre entera en un hilo de clasificación, así que el controlador de
+# tasa (espera, reintentos) y el backend (tokens, tiempos del proveedor, parseo) anotan sus
+# datos en la medición del hilo, que RegistroEjecucion abre y cierra alrededor de la llamada.
+_hilo = threading.local()
+
+
+def anotar(**valores):
+    # Suma los valores numéricos a la medición en curso; los textos (p. ej. `error`) la
+    # reemplazan. Sin una medición abierta no hace nada.
+    medicion = getattr(_hilo, "medicion", None)
+    if medicion is None:
+        return
+    for clave, valor in valores.items():
+        if isinstance(valor, str):
+            medicion[clave] = valor
+        elif valor:
+            medicion[clave] = medicion.get(clave, 0) + valor
+
+
+# === MÉTRICAS DEL PROCESO (FORMATO PROMETHEUS) ===
+LIMITES_LATENCIA = (0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+class MetricasProceso:
+    # Totales acumulados desde que arrancó el proceso, por backend.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.contadores = defaultdict(float)
+        self.latencias = defaultdict(lambda: [0] * (len(LIMITES_LATENCIA) + 1))
+
+    def observar(self, evento):
+        backend = evento["backend"]
+        resultado = "error" if evento.get("error") else "ok"
+        with self.lock:
+            self.contadores[("clasificador_llamadas_total", backend, resultado)] += 1
+            self.contadores[("clasificador_textos_total", backend, "")] += evento["textos"]
+            self.contadores[("clasificador_reintentos_total", backend, "")] += evento.get("reintentos", 0)
+            self.contadores[("clasificador_limites_cuota_total", backend, "")] += evento.get("limites", 0)
+            self.contadores[("clasificador_espera_segundos_total", backend, "")] += evento.get("espera", 0)
+            self.contadores[("clasificador_tokens_prompt_total", backend, "")] += evento.get("tokens_prompt", 0)
+            self.contadores[("clasificador_tokens_respuesta_total", backend, "")] += evento.get("tokens_respuesta", 0)
+            self.contadores[("clasificador_latencia_segundos_sum", backend, "")] += evento["latencia"]
+            cubetas = self.latencias[backend]
+            for i, limite in enumerate(LIMITES_LATENCIA):
+                if evento["latencia"] <= limite:
+                    cubetas[i] += 1
+            cubetas[-1] += 1
+
+    def texto(self):
+        # Formato de exposición de texto de Prometheus (versión 0.0.4).
+        lineas = []
+        with self.lock:
+            for (nombre, backend, resultado), valor in sorted(self.contadores.items()):
+                etiquetas = f'backend="{backend}"' + (f',resultado="{resultado}"' if resultado else "")
+                lineas.append(f"{nombre}{{{etiquetas}}} {valor:g}")
+            for backend, cubetas in sorted(self.latencias.items()):
+                for limite, cantidad in zip(LIMITES_LATENCIA, cubetas):
+                    lineas.append(f'clasificador_latencia_segundos_bucket{{backend="{backend}",le="{limite}"}} {cantidad}')
+                lineas.append(f'clasificador_latencia_segundos_bucket{{backend="{backend}",le="+Inf"}} {cubetas[-1]}')
+                lineas.append(f'clasificador_latencia_segundos_count{{backend="{backend}"}} {cubetas[-1]}')
+        return "\n".join(lineas) + "\n"
+
+
+METRICAS = MetricasProceso()
+
+
+def iniciar_servidor_metricas(puerto, direccion=None):
+    # Expone METRICAS en http://<direccion>:<puerto>/metrics desde un hilo aparte. Por defecto
+    # solo en esta máquina; con METRICAS_DIRECCION=0.0.0.0 queda accesible desde la red.
+    direccion = direccion or os.getenv("METRICAS_DIRECCION", "127.0.0.1")
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            contenido = METRICAS.texto().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(contenido)))
+            self.end_headers()
+            self.wfile.write(contenido)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer((direccion, puerto), Manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+# === REGISTRO DE UNA EJECUCIÓN ===
+class RegistroEjecucion:
+    # Mide cada llamada al modelo de una corrida y la agrega como una línea JSON a `ruta`
+    # (si se indica) y a METRICAS. Los eventos "llamada" separan el tiempo total en espera
+    # por cuota y reintentos, llamada al proveedor (red y generación) y parseo; los eventos
+    # "fila" registran el resultado de cada fila.
+    def __init__(self, backend, ruta=None):
+        self.backend = backend.etiqueta
+        self.modelo = backend.modelo
+        self.ruta = ruta
+        self.inicio = time.time()
+        self.lock = threading.Lock()
+        self.llamadas = []
+        if ruta:
+            os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+
+    def _escribir(self, eventos):
+        if not self.ruta or not eventos:
+            return
+        lineas = "".join(json.dumps(evento, ensure_ascii=False) + "\n" for evento in eventos)
+        with self.lock:
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(lineas)
+
+    def _medir(self, funcion, argumento, textos):
+        _hilo.medicion = medicion = {}
+        inicio = time.perf_counter()
+        try:
+            resultado = funcion(argumento)
+        finally:
+            _hilo.medicion = None
+            latencia = time.perf_counter() - inicio
+        resultados = resultado if isinstance(resultado, list) else [resultado]
+        errores = sum(1 for r in resultados if r is not None and r[0] == "ERROR")
+        incompletos = sum(1 for r in resultados if r is None)
+        if errores and "error" not in medicion:
+            medicion["error"] = "RespuestaInvalida"
+        evento = {
+            "tipo": "llamada",
+            "momento": time.time(),
+            "backend": self.backend,
+            "modelo": self.modelo,
+            "textos": textos,
+            "latencia": latencia,
+            **medicion,
+            "errores": errores,
+            "incompletos": incompletos,
+        }
+        with self.lock:
+            self.llamadas.append(evento)
+        METRICAS.observar(evento)
+        self._escribir([evento])
+        return resultado
+
+    def envolver(self, clasificar):
+        def clasificar_medido(texto):
+            return self._medir(clasificar, texto, 1)
+
+        return clasificar_medido
+
+    def envolver_lote(self, clasificar_lote):
+        def clasificar_lote_medido(textos):
+            return self._medir(clasificar_lote, textos, len(textos))
+
+        return clasificar_lote_medido
+
+    def registrar_filas(self, registros):
+        # `registros` es una lista de (fila, categoria, razon), como en trabajos.Trabajo.
+        momento = time.time()
+        self._escribir([
+            {
+                "tipo": "fila",
+                "momento": momento,
+                "backend": self.backend,
+                "fila": int(fila),
+                "estado": "ERROR" if categoria == "ERROR" else "OK",
+                "categoria": categoria,
+            }
+            for fila, categoria, _ in registros
+        ])
+
+    def resumen(self, hechas=0, total=None):
+        # Ritmo, tiempo restante estimado, tasa de error y reparto del tiempo de las llamadas.
+        with self.lock:
+            llamadas = list(self.llamadas)
+        transcurrido = max(time.time() - self.inicio, 1e-9)
+        ritmo = hechas / transcurrido
+        latencias = sorted(evento["latencia"] for evento in llamadas)
+
+        def percentil(p):
+            return latencias[min(len(latencias) - 1, int(p * len(latencias)))] if latencias else 0.0
+
+        def suma(clave):
+            return sum(evento.get(clave, 0) for evento in llamadas)
+
+        return {
+            "transcurrido": transcurrido,
+            "por_segundo": ritmo,
+            "restante": (total - hechas) / ritmo if total is not None and ritmo > 0 else None,
+            "llamadas": len(llamadas),
+            "tasa_errores": sum(1 for evento in llamadas if evento.get("error")) / len(llamadas) if llamadas else 0.0,
+            "p50": percentil(0.5),
+            "p95": percentil(0.95),
+            "latencia": suma("latencia"),
+            "espera": suma("espera"),
+            "segundos_llamada": suma("segundos_llamada"),
+            "segundos_generacion": suma("segundos_generacion"),
+            "segundos_parseo": suma("segundos_parseo"),
+            "reintentos": suma("reintentos"),
+            "tokens_prompt": suma("tokens_prompt"),
+            "tokens_respuesta": suma("tokens_respuesta"),
+        }
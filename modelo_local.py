@@ -0,0 +1,126 @@
+import argparse
+import os
+
+import pandas as pd
+
+from normalizacion import normalizar_texto
+from respuestas import categoria_valida
+
+try:
+    import joblib
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import make_pipeline
+    SKLEARN_DISPONIBLE = True
+except ImportError:
+    SKLEARN_DISPONIBLE = False
+
+RUTA_MODELO = os.getenv("MODELO_LOCAL", os.path.join("modelos", "clasificador_local.joblib"))
+
+# Columnas que agregan las apps al archivo clasificado; la final de la cascada o la
+# votación tiene prioridad.
+COLUMNAS_ETIQUETA = ["Clasificacion-Final", "Clasificacion-Gemini", "Clasificacion-Deepseek"]
+
+# Etiquetas que no sirven para entrenar: no son un tipo de incidente.
+ETIQUETAS_EXCLUIDAS = {"ERROR", "REVISAR"}
+
+# Comienzo de las razones de las filas que el pipeline resolvió sin consultar al modelo
+# (reglas.py y lotes.py). Entrenar con ellas le devolvería al modelo local sus propias
+# predicciones y le inflaría la confianza.
+RAZONES_AUTOMATICAS = ("Clasificado por el modelo local", "Clasificado por regla", "Celda vacía")
+
+
+# === DATOS DE ENTRENAMIENTO ===
+def _columna_texto(df, columnas_excluidas):
+    # Sin columna indicada se usa la columna de texto con descripciones más largas.
+    candidatas = [
+        c for c in df.columns
+        if c not in columnas_excluidas and not str(c).startswith("Razon-")
+        and (pd.api.types.is_object_dtype(df[c]) or pd.api.types.is_string_dtype(df[c]))
+    ]
+    if not candidatas:
+        raise ValueError("El archivo no tiene columnas de texto para entrenar.")
+    return max(candidatas, key=lambda c: df[c].astype(str).str.len().mean())
+
+
+def leer_etiquetados(archivos, columna=None):
+    # Lee archivos *_clasificado.xlsx/.csv y devuelve un DataFrame con columnas "texto" y
+    # "categoria". Si un archivo tiene varias columnas de clasificación se usa la primera.
+    partes = []
+    for archivo in archivos:
+        nombre = getattr(archivo, "name", str(archivo))
+        df = pd.read_csv(archivo) if nombre.endswith(".csv") else pd.read_excel(archivo)
+        etiquetas = [c for c in COLUMNAS_ETIQUETA if c in df.columns]
+        if not etiquetas:
+            raise ValueError(f"{nombre}: no tiene columnas {' ni '.join(COLUMNAS_ETIQUETA)}.")
+        texto = columna if columna is not None else _columna_texto(df, etiquetas)
+        razon = etiquetas[0].replace("Clasificacion-", "Razon-", 1)
+        if razon in df.columns:
+            df = df[~df[razon].fillna("").astype(str).str.startswith(RAZONES_AUTOMATICAS)]
+        partes.append(pd.DataFrame({"texto": df[texto], "categoria": df[etiquetas[0]]}))
+
+    datos = pd.concat(partes, ignore_index=True).dropna()
+    datos["categoria"] = datos["categoria"].astype(str).map(categoria_valida)
+    datos = datos.dropna()
+    datos = datos[~datos["categoria"].isin(ETIQUETAS_EXCLUIDAS)]
+    return datos.drop_duplicates("texto").reset_index(drop=True)
+
+
+# === MODELO TF-IDF + REGRESIÓN LOGÍSTICA ===
+class ClasificadorLocal:
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    @classmethod
+    def entrenar(cls, textos, categorias):
+        if not SKLEARN_DISPONIBLE:
+            raise RuntimeError("Instalá scikit-learn para usar el modelo local.")
+        if len(set(categorias)) < 2:
+            raise ValueError("Se necesitan al menos dos tipos de incidente distintos para entrenar.")
+        pipeline = make_pipeline(
+            TfidfVectorizer(preprocessor=normalizar_texto, ngram_range=(1, 2), min_df=1, sublinear_tf=True),
+            LogisticRegression(max_iter=1000, class_weight="balanced"),
+        )
+        pipeline.fit(list(textos), list(categorias))
+        return cls(pipeline)
+
+    @classmethod
+    def cargar(cls, ruta=RUTA_MODELO):
+        if not SKLEARN_DISPONIBLE:
+            raise RuntimeError("Instalá scikit-learn para usar el modelo local.")
+        return cls(joblib.load(ruta))
+
+    def guardar(self, ruta=RUTA_MODELO):
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        joblib.dump(self.pipeline, ruta)
+
+    def predecir(self, textos):
+        # Devuelve (categorias, confianzas) para una lista de textos.
+        textos = [str(t) for t in textos]
+        if not textos:
+            return [], []
+        probabilidades = self.pipeline.predict_proba(textos)
+        clases = self.pipeline.classes_
+        mejores = probabilidades.argmax(axis=1)
+        return [str(clases[i]) for i in mejores], probabilidades.max(axis=1).tolist()
+
+
+# === LÍNEA DE COMANDOS ===
+def main():
+    parser = argparse.ArgumentParser(description="Entrena el modelo local con archivos ya clasificados.")
+    parser.add_argument("archivos", nargs="+", help="Archivos *_clasificado.xlsx o .csv")
+    parser.add_argument("--columna", help="Columna con el texto del incidente (por defecto se detecta)")
+    parser.add_argument("--salida", default=RUTA_MODELO, help="Ruta del modelo entrenado")
+    args = parser.parse_args()
+
+    datos = leer_etiquetados(args.archivos, args.columna)
+    modelo = ClasificadorLocal.entrenar(datos["texto"], datos["categoria"])
+    modelo.guardar(args.salida)
+    print(f"Modelo entrenado con {len(datos)} textos y guardado en {args.salida}")
+    print(datos["categoria"].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
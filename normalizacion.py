@@ -0,0 +1,11 @@
+import re
+import unicodedata
+
+
+# === NORMALIZACIÓN DE TEXTOS ===
+def normalizar_texto(texto):
+    # Mayúsculas, sin acentos y con espacios colapsados: dos descripciones que solo
+    # difieren en esos detalles se consideran el mismo texto.
+    texto = unicodedata.normalize("NFKD", str(texto))
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.sub(r"\s+", " ", texto).strip().upper()
@@ -0,0 +1,153 @@
+from respuestas import CATEGORIAS
+
+# === PROMPTS DE CLASIFICACIÓN ===
+# Definiciones completas de cada tipo de incidente (usadas con Gemini).
+DEFINICIONES_COMPLETAS = """1. El Tipo de incidente más adecuado según la siguiente lista, basada en la definición, contexto y ejemplos proporcionados:
+   - BARRERA ROTA:
+     - Definición: Se entiende que hay un caso de barrera rota cuando se informa por el conductor o ayudente que cualquiera de sus brazos está roto.
+     - Contexto: Usualmente, pero no siempre, en el texto se encuentra este tipo de incidente como 'brazo ascendente o brazo descendente roto'. Además se suele mencionar el paso a nivel  con la barrera rota y la persona que informa (conductor o ayudante). Si no es informado por el conductor o ayudante no se considera un incidente. En el texto suele haber abreviaturas, por ejemplo 'COND.' para conductor, 'AYTE' para ayudante; aunque pueden aparecer de otras maneras similares  y otras abreviaturas, son muy comunes ZDV para zona de vías y PAN o P.A.N. para paso a nivel. Puede ser también que no se mencione si el barzo es ascendente o descendente.
+     - Ejemplos: COND. CORREA M. (3116) INFORMA P.A.N. RIVADAVIA KM. 33/026, BRAZO DESCENDENTE ROTO. T. 3056/E706. SR. DEL VALLE SEÑALAMIENTO - SR. HERNANDEZ RESG. C/AVISO. SR. DEL VALLE DA EL NORMAL C/SEGURIDAD.-
+
+   - BRAZOS DE BARRERA LEVANTADOS:
+     - Definición: Se entiende que hay un caso de brazo de barrera girado hacia la vía  cuando cualquiera de sus brazos  se informa por el conductor o ayudente se encuentran girados hacia la zona de vía, puede ser en algunos casos que ocupen parte de la vía.
+     - Contexto: Usualmente, pero no siempre, en el texto se encuentra este tipo de incidente como 'brazo ascendente permanece levantado o brazo descendente permanece levantado'. Además se suele mencionar el paso a nivel  con el brazo levantado y la persona que informa (conductor o ayudante). Si no es informado por el conductor o ayudante no se considera un incidente. En el texto suele haber abreviaturas, por ejemplo 'COND.' para conductor, 'AYTE' para ayudante; aunque pueden aparecer de otras maneras similares  y otras abreviaturas, son muy comunes ZDV para zona de vías y PAN o P.A.N. para paso a nivel. Puede ser también que no se mencione si el barzo es ascendente o descendente.
+     - Ejemplos: COND. GUZMÁN J. (3068), DE T. 3074/E721, INFORMA QUE BRAZO DESCENDENTE DE P.A.N. RUTA 25 KM 51/434 PERMANECEN LEVANTADOS. MEC. BARRETO C/A. SR. BOGADO, RESG., C/A. MEC. DEL VALLE DA NORMAL, SIN CUSTODIA.
+
+   - BRAZOS DE BARRERA GIRADOS HACIA LA VÍA:
+     - Definición: Se entiende que hay un caso de brazo de barrera girado hacia la vía cuando cualquiera de sus brazos  se encuentra girado hacia la zona de vía, puede ser en algunos casos que ocupen parte de la vía.
+     - Contexto: Usualmente, pero no siempre, en el texto se encuentra este tipo de incidente como 'brazo ascendente girado hacia la vía o brazo descendente girado hacia la vía'. Además se suele mencionar el paso a nivel  con el brazo girado y la persona que informa (conductor o ayudante). Si no es informado por el conductor o ayudante no se considera un incidente. En el texto suele haber abreviaturas, por ejemplo 'COND.' para conductor, 'AYTE' para ayudante; aunque pueden aparecer de otras maneras similares y otras abreviaturas, son muy comunes ZDV para zona de vías y PAN o P.A.N. para paso a nivel. Puede ser también que no se mencione si el barzo es ascendente o descendente.
+     - Ejemplos: COND. OLIVA (3125) TREN 3113 LOC. E705, COMUNICA P.A.N YRIGOYEN KM 15/649 BRAZO DESCENDENTE GIRADO HACIA ZONA DE VÍA. BARRIENTOS, SEÑALAMIENTO, C/A.PACHECO, RESG, C/A. MEC. BARRETO DA EL NORMAL, CON RESG.
+      
+   - INVASIÓN DE VÍA:
+     - Definición: Se entiende que hay un caso de invasión de vía cuando el conductor o ayudante tiene que aplicar el freno de emergencia debido a la invasión u ocupación de la vía por una persona, animal,  vehículo u otro objeto que cruza, ocupa o transita sobre las vías de modo que puede ocasionar un accidente.
+     - Contexto: Usualmente, pero no siempre, en el texto se encuentra este tipo de incidente como 'conductor o ayudante aplicó freno de emergencia para evitar accidente de persona', 'conductor o ayudante aplicó freno de emergencia para evitar arrollar a animal (caballo, vaca, perro, etc.)' o 'conductor o ayudante aplicó freno de emergencia para evitar colisión o arrollar un vehículo'. Además se suele mencionar el paso a nivel o la progresiva de la vía (kilómetro) del incidente y la persona que informa el hecho. En el texto suele haber abreviaturas, por ejemplo 'COND.' para conductor, 'AYTE' para ayudante; aunque pueden aparecer de otras maneras similares y otras abreviaturas, son muy comunes ZDV para zona de vías y PAN o P.A.N. para paso a nivel.
+     - Ejemplos: COND. CARBONEL (3023), T. 3154/E705 (4945-84), COMUNICA QUE APLICÓ  FRENO DE EMERGENCIA EN KM 38/400 PARA EVITAR ACCIDENTE DE PERSONA,LAS MISMAS SE CORRIERON Y COMENZARON A TIRAR PIEDRAS A LA FORMACIÓN. C/A. SR. MICALIZZI, RESG; SR. ACUÑA, VIDEO; AUX. MEDINA. DETENIDO 04 MINUTOS EN EST. GRAND BOURG, GDA. GONZALEZ (72042) CHEQUEA FORMACIÓN PARA VER SI HAY PASAJEROS LESIONADOS; SIN CONSECUENCIA.
+
+   - PARADA INCORRECTA:
+     - Definición: Se entiende que hay un caso de parada incorrecta cuando la formación (tren) no queda alineada con respecto a la zona habilitada para el ascenso y descenso de pasajeros (andén), puede ser que la formación quede antes o después de la zona. Usualmente sucede por deficiencias en los frenos o error en la aplicación del freno.
+     - Contexto: Usualmente, pero no siempre, en el texto se encuentra este tipo de incidente como 'parada incorrecta'. Además se suele mencionar el nombre de la persona que informa el hecho, el nombre de la estación en que ocurre y la cantidad de coches que quedaron fuera de la plataforma o andén. En el texto suele haber abreviaturas, por ejemplo 'COND.' para conductor, 'AYTE' para ayudante; aunque pueden aparecer de otras maneras similares y otras abreviaturas, son muy comunes ZDV para zona de vías y PAN o P.A.N. para paso a nivel.
+     - Ejemplos: COND. MARTINEZ MILTON (3019) TREN 3039 LOC. E709 4984-45, COMUNICA EN ESTACIÓN VILLA ADELINA, PARADA INCORRECTA, QUEDANDO LOCOMOTORA Y MEDIO COCHE FUERA DE LA PLATAFORMA, MANIFIESTA QUE FUE UN ERROR DE CALCULO,  SIN CONSECUENCIA. ALBARRACIN, INFORMES, C/A. CASTILLO, C/A. VIDEO, C/A.
+
+   - EXCESO DE VELOCIDAD:
+     - Definición: Se entiende que hay un caso de exceso de velocidad cuando una formación (tren) supera el límite permitido para un determinado tramo de vía.
+     - Contexto: Usualmente, pero no siempre, en el texto se encuentra este tipo de incidente como 'exceso de velocidad'. Además se suele mencionar el número de tren, la velocidad del tren, la progresiva o kilómetro del hecho, y la persona que informa el hecho. En el texto suele haber abreviaturas, por ejemplo 'COND.' para conductor, 'AYTE' para ayudante; aunque pueden aparecer de otras maneras similares y otras abreviaturas, son muy comunes ZDV para zona de vías y PAN o P.A.N. para paso a nivel.
+     - Ejemplos: CONTROLADOR GAVILAN DE CENTRO DE MONITOREO S.O.F.S.E. INFORMA POR  EXCESO DE VELOCIDAD DEL TREN 3086/E701 A 50 KM/H DEL KM. 39/000 AL  38/740. PRECAUCION DE 12 KM/H DEL KM. 39/070 AL 39/030 POR VÍA RENOVADA. C/A. SR. CODIGONI; SR. SERVIDIO; SR. GOMEZ DE VIDEO; AUX GONZALEZ. COND. VEGA D. (3050), COMUNICA QUE RESPETO LA PRECAUCION.
+
+2. Una breve razón de por qué fue clasificado así, haciendo referencia a los detalles clave del texto que justifican la clasificación."""
+
+# Definiciones abreviadas para modelos locales con menos contexto (usadas con Ollama).
+DEFINICIONES_BREVES = """1. El Tipo de incidente más adecuado según la siguiente lista, basada en la definición, contexto y ejemplos proporcionados:
+   - BARRERA ROTA:
+     - Definición: Se entiende que hay un caso de barrera rota cuando se informa por el conductor o ayudente que cualquiera de sus brazos está roto.
+     - Contexto: Usualmente, pero no siempre, en el texto se encuentra este tipo de incidente como 'brazo ascendente o brazo descendente roto'. Además se suele mencionar el paso a nivel  con la barrera rota y la persona que informa (conductor o ayudante). Si no es informado por el conductor o ayudante no se considera un incidente. En el texto suele haber abreviaturas, por ejemplo 'COND.' para conductor, 'AYTE' para ayudante; aunque pueden aparecer de otras maneras similares  y otras abreviaturas, son muy comunes ZDV para zona de vías y PAN o P.A.N. para paso a nivel. Puede ser también que no se mencione si el brazo es ascendente o descendente.
+     - Ejemplos: COND. CORREA M. (3116) INFORMA P.A.N. RIVADAVIA KM. 33/026, BRAZO DESCENDENTE ROTO. T. 3056/E706. SR. DEL VALLE SEÑALAMIENTO - SR. HERNANDEZ RESG. C/AVISO. SR. DEL VALLE DA EL NORMAL C/SEGURIDAD.-
+
+   - BRAZOS DE BARRERA LEVANTADOS:
+     - Definición: Se entiende que hay un caso de brazo de barrera levantado cuando cualquiera de sus brazos se informa por el conductor o ayudente que permanecen levantados.
+     - Contexto: Usualmente, pero no siempre, en el texto se encuentra este tipo de incidente como 'brazo ascendente permanece levantado o brazo descendente permanece levantado'. Además se suele mencionar el paso a nivel y la persona que informa. Si no es informado por el conductor o ayudante no se considera un incidente.
+     - Ejemplos: COND. GUZMÁN J. (3068), DE T. 3074/E721, INFORMA QUE BRAZO DESCENDENTE DE P.A.N. RUTA 25 KM 51/434 PERMANECEN LEVANTADOS. MEC. BARRETO C/A. SR. BOGADO, RESG., C/A. MEC. DEL VALLE DA NORMAL, SIN CUSTODIA.
+
+   - BRAZOS DE BARRERA GIRADOS HACIA LA VÍA:
+     - Definición: Se entiende que hay un caso de brazo de barrera girado hacia la vía cuando cualquiera de sus brazos se encuentra girado hacia la zona de vía, puede ser en algunos casos que ocupen parte de la vía.
+     - Ejemplos: COND. OLIVA (3125) TREN 3113 LOC. E705, COMUNICA P.A.N YRIGOYEN KM 15/649 BRAZO DESCENDENTE GIRADO HACIA ZONA DE VÍA. BARRIENTOS, SEÑALAMIENTO, C/A.PACHECO, RESG, C/A. MEC. BARRETO DA EL NORMAL, CON RESG.
+
+   - INVASIÓN DE VÍA:
+     - Definición: El conductor o ayudante aplica freno de emergencia por invasión de vía por persona, animal, vehículo u objeto.
+     - Ejemplos: COND. CARBONEL (3023), T. 3154/E705 (4945-84), COMUNICA QUE APLICÓ  FRENO DE EMERGENCIA EN KM 38/400 PARA EVITAR ACCIDENTE DE PERSONA,LAS MISMAS SE CORRIERON Y COMENZARON A TIRAR PIEDRAS A LA FORMACIÓN. C/A. SR. MICALIZZI, RESG; SR. ACUÑA, VIDEO; AUX. MEDINA.
+
+   - PARADA INCORRECTA:
+     - Definición: La formación no queda alineada con el andén, puede deberse a falla o error de frenado.
+     - Ejemplos: COND. MARTINEZ MILTON (3019) TREN 3039 LOC. E709 4984-45, COMUNICA EN ESTACIÓN VILLA ADELINA, PARADA INCORRECTA, QUEDANDO LOCOMOTORA Y MEDIO COCHE FUERA DE LA PLATAFORMA, MANIFIESTA QUE FUE UN ERROR DE CALCULO,  SIN CONSECUENCIA.
+
+   - EXCESO DE VELOCIDAD:
+     - Definición: La formación excede la velocidad máxima permitida para el tramo.
+     - Ejemplos: CONTROLADOR GAVILAN DE CENTRO DE MONITOREO S.O.F.S.E. INFORMA POR  EXCESO DE VELOCIDAD DEL TREN 3086/E701 A 50 KM/H DEL KM. 39/000 AL  38/740. PRECAUCION DE 12 KM/H DEL KM. 39/070 AL 39/030 POR VÍA RENOVADA. C/A. SR. CODIGONI; SR. SERVIDIO; SR. GOMEZ DE VIDEO; AUX GONZALEZ. COND. VEGA D. (3050), COMUNICA QUE RESPETO LA PRECAUCION.
+
+2. Una breve razón de por qué fue clasificado así, haciendo referencia a los detalles clave del texto que justifican la clasificación."""
+
+
+# Definiciones compactas: las abreviaturas y la condición del informante se explican una sola
+# vez en lugar de repetirse en cada tipo. Menos tokens por llamada.
+DEFINICIONES_COMPACTAS = """1. El Tipo de incidente, uno de:
+   - BARRERA ROTA: se informa que un brazo (ascendente o descendente) de la barrera está roto. Ej.: COND. CORREA M. (3116) INFORMA P.A.N. RIVADAVIA KM. 33/026, BRAZO DESCENDENTE ROTO.
+   - BRAZOS DE BARRERA LEVANTADOS: se informa que los brazos de la barrera permanecen levantados. Ej.: COND. GUZMÁN J. (3068) INFORMA QUE BRAZO DESCENDENTE DE P.A.N. RUTA 25 KM 51/434 PERMANECEN LEVANTADOS.
+   - BRAZOS DE BARRERA GIRADOS HACIA LA VÍA: un brazo de la barrera quedó girado hacia la zona de vía. Ej.: COND. OLIVA (3125) COMUNICA P.A.N YRIGOYEN KM 15/649 BRAZO DESCENDENTE GIRADO HACIA ZONA DE VÍA.
+   - INVASIÓN DE VÍA: se aplicó freno de emergencia para evitar arrollar o colisionar con una persona, animal, vehículo u objeto en la vía. Ej.: COND. CARBONEL (3023) COMUNICA QUE APLICÓ FRENO DE EMERGENCIA EN KM 38/400 PARA EVITAR ACCIDENTE DE PERSONA.
+   - PARADA INCORRECTA: la formación no quedó alineada con el andén (coches fuera de la plataforma). Ej.: COND. MARTINEZ MILTON (3019) COMUNICA EN ESTACIÓN VILLA ADELINA, PARADA INCORRECTA, QUEDANDO LOCOMOTORA Y MEDIO COCHE FUERA DE LA PLATAFORMA.
+   - EXCESO DE VELOCIDAD: la formación superó la velocidad permitida en el tramo. Ej.: CONTROLADOR GAVILAN INFORMA POR EXCESO DE VELOCIDAD DEL TREN 3086/E701 A 50 KM/H DEL KM. 39/000 AL 38/740.
+   Los casos de barreras solo son incidentes si los informa el conductor o el ayudante. Abreviaturas frecuentes: COND. = conductor, AYTE = ayudante, PAN o P.A.N. = paso a nivel, ZDV = zona de vías.
+
+2. Una breve razón de por qué fue clasificado así, haciendo referencia a los detalles clave del texto que justifican la clasificación."""
+
+
+# === PLANTILLAS VERSIONADAS ===
+class PlantillaPrompt:
+    # Separa las instrucciones fijas (definiciones y formato de salida) del texto a
+    # clasificar. La parte fija se envía como instrucción de sistema, idéntica en todas las
+    # llamadas, para que el proveedor la reutilice como prefijo en cache (context caching
+    # de Gemini, KV cache de Ollama) en lugar de procesarla de nuevo en cada fila.
+    # `version` forma parte de la clave de la cache de clasificaciones: cambiarla al editar
+    # el texto de la plantilla.
+    def __init__(self, nombre, version, definiciones):
+        self.nombre = nombre
+        self.version = version
+        self.definiciones = definiciones
+        self.sistema = f"""Leé la descripción de un incidente ferroviario que se indica como Texto y devolvé SOLO:
+
+{definiciones}
+
+Formato de salida:
+Tipo de Incidente: <nombre del tipo de incidente>
+Razón: <explicación>
+
+En caso de dudas sobre la clasificación, devolvé 'REVISAR' como Tipo de Incidente y una breve explicación.
+Si no hay dudas y el texto no se corresponde con ninguno de los Tipos de Incidente proporcionados, devolvé 'FILA SIN EVENTOS' como Tipo de Incidente y una breve explicación.
+"""
+        self.sistema_lote = f"""Leé las descripciones numeradas de incidentes ferroviarios que se indican y, para cada una por separado, determiná:
+
+{definiciones}
+
+Formato de salida: devolvé SOLO una línea JSON por descripción, en el mismo orden y sin texto adicional:
+{{"id": <número de la descripción>, "tipo": "<nombre del tipo de incidente>", "razon": "<explicación>"}}
+
+En caso de dudas sobre la clasificación, devolvé 'REVISAR' como tipo y una breve explicación.
+Si no hay dudas y el texto no se corresponde con ninguno de los Tipos de Incidente proporcionados, devolvé 'FILA SIN EVENTOS' como tipo y una breve explicación.
+"""
+
+        # Para el modo manual en streaming: un objeto JSON con el tipo antes que la razón, así
+        # la categoría se puede mostrar apenas se genera.
+        self.sistema_json = f"""Leé la descripción de un incidente ferroviario que se indica como Texto y devolvé SOLO:
+
+{definiciones}
+
+Formato de salida: un único objeto JSON, sin texto adicional, con "tipo" antes que "razon":
+{{"tipo": "<nombre del tipo de incidente>", "razon": "<explicación>"}}
+
+En caso de dudas sobre la clasificación, devolvé 'REVISAR' como tipo y una breve explicación.
+Si no hay dudas y el texto no se corresponde con ninguno de los Tipos de Incidente proporcionados, devolvé 'FILA SIN EVENTOS' como tipo y una breve explicación.
+"""
+
+    def usuario(self, texto):
+        return f"Texto: {texto}\n"
+
+    def usuario_lote(self, textos):
+        numerados = "\n".join(f"[{i}] {' '.join(str(texto).split())}" for i, texto in enumerate(textos, start=1))
+        return f"Descripciones:\n{numerados}\n"
+
+
+# Esquema de la respuesta de sistema_json para los proveedores con salida estructurada.
+ESQUEMA_RESPUESTA = {
+    "type": "object",
+    "properties": {
+        "tipo": {"type": "string", "enum": CATEGORIAS},
+        "razon": {"type": "string"},
+    },
+    "required": ["tipo", "razon"],
+}
+
+
+PLANTILLAS = {
+    "completa": PlantillaPrompt("completa", "completa-2", DEFINICIONES_COMPLETAS),
+    "breve": PlantillaPrompt("breve", "breve-2", DEFINICIONES_BREVES),
+    "compacta": PlantillaPrompt("compacta", "compacta-1", DEFINICIONES_COMPACTAS),
+}
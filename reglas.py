@@ -0,0 +1,83 @@
+import re
+
+import pandas as pd
+
+
+# === PRECLASIFICACIÓN POR REGLAS ===
+# Frases que el prompt señala como típicas de cada tipo de incidente. Se buscan sobre el
+# texto en mayúsculas y sin acentos, por lo que los patrones no llevan tildes.
+REGLAS = {
+    "BARRERA ROTA": r"BRAZOS? (?:(?:ASCENDENTE|DESCENDENTE)S? )?(?:(?!(?:NO|SIN|NI)\b)\w+ ){0,2}ROTOS?\b|BARRERAS? ROTAS?\b",
+    "BRAZOS DE BARRERA LEVANTADOS": r"PERMANECEN? LEVANTAD[OA]S?\b",
+    "BRAZOS DE BARRERA GIRADOS HACIA LA VÍA": r"GIRAD[OA]S? HACIA (?:LA )?(?:ZONA DE )?(?:VIAS?|ZDV)\b",
+    "INVASIÓN DE VÍA": r"FRENO DE EMERGENCIA\b",
+    "PARADA INCORRECTA": r"PARADA INCORRECTA\b",
+    "EXCESO DE VELOCIDAD": r"EXCESO DE VELOCIDAD\b",
+}
+
+# Las barreras solo cuentan como incidente si las informa el conductor o el ayudante.
+INFORMANTE = r"\b(?:COND\.?|CONDUCTOR|AYTE\.?|AYUDANTE)(?=\W|$)"
+REQUIERE_INFORMANTE = {
+    "BARRERA ROTA",
+    "BRAZOS DE BARRERA LEVANTADOS",
+    "BRAZOS DE BARRERA GIRADOS HACIA LA VÍA",
+}
+
+# El freno de emergencia solo indica invasión de vía si se aplicó para evitar algo.
+MOTIVO_INVASION = r"\b(?:EVITAR|ARROLLAR|ACCIDENTE|COLISION|INVASION|PERSONA|ANIMAL|VEHICULO)"
+
+# Una frase precedida por una negación ("NO HUBO PARADA INCORRECTA", "SIN EXCESO DE
+# VELOCIDAD") no se resuelve por regla: esas filas van al modelo.
+NEGACION = r"\b(?:NO|SIN|NI|NUNCA)\b(?: \w+){0,2} "
+
+_REGLAS_COMPILADAS = {categoria: re.compile(f"({patron})") for categoria, patron in REGLAS.items()}
+_NEGACIONES_COMPILADAS = {categoria: re.compile(f"{NEGACION}(?:{patron})") for categoria, patron in REGLAS.items()}
+
+
+def normalizar_columna(serie):
+    # Las celdas vacías (NaN o None) quedan como texto vacío: no coinciden con ninguna regla.
+    return (
+        serie.fillna("").astype(str)
+        .str.normalize("NFKD")
+        .str.encode("ascii", "ignore")
+        .str.decode("ascii")
+        .str.upper()
+        .str.replace(r"\s+", " ", regex=True)
+    )
+
+
+def preclasificar(serie):
+    # Devuelve un DataFrame con el mismo índice que `serie` y columnas "categoria" y "razon".
+    # Solo se completan las filas donde exactamente una regla coincide sin ambigüedad;
+    # las demás quedan en NaN y deben enviarse al modelo.
+    # Como object para que pandas use el módulo re (los patrones usan lookahead, que el
+    # motor de expresiones de pyarrow no admite).
+    textos = normalizar_columna(pd.Series(serie)).astype(object)
+    hay_informante = textos.str.contains(INFORMANTE, regex=True)
+    hay_motivo = textos.str.contains(MOTIVO_INVASION, regex=True)
+
+    frases = pd.DataFrame(index=textos.index)
+    for categoria, patron in _REGLAS_COMPILADAS.items():
+        frases[categoria] = textos.str.extract(patron, expand=False)
+
+    coincidencias = frases.notna()
+    unica = coincidencias.sum(axis=1) == 1
+    categoria = coincidencias.idxmax(axis=1).where(unica)
+
+    confiable = unica & ~(categoria.isin(REQUIERE_INFORMANTE) & ~hay_informante)
+    confiable &= ~((categoria == "INVASIÓN DE VÍA") & ~hay_motivo)
+    for nombre, patron in _NEGACIONES_COMPILADAS.items():
+        filas = confiable & (categoria == nombre)
+        if filas.any():
+            confiable &= ~(filas & textos.str.contains(patron, regex=True))
+
+    resultado = pd.DataFrame(index=textos.index, columns=["categoria", "razon"], dtype=object)
+    for nombre in REGLAS:
+        filas = confiable & (categoria == nombre)
+        if not filas.any():
+            continue
+        resultado.loc[filas, "categoria"] = nombre
+        resultado.loc[filas, "razon"] = (
+            "Clasificado por regla: el texto menciona '" + frases.loc[filas, nombre] + "'."
+        )
+    return resultado
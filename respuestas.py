@@ -0,0 +1,144 @@
+import json
+import re
+
+from normalizacion import normalizar_texto
+
+
+# === TIPOS DE INCIDENTE VÁLIDOS ===
+CATEGORIAS = [
+    "BARRERA ROTA",
+    "BRAZOS DE BARRERA LEVANTADOS",
+    "BRAZOS DE BARRERA GIRADOS HACIA LA VÍA",
+    "INVASIÓN DE VÍA",
+    "PARADA INCORRECTA",
+    "EXCESO DE VELOCIDAD",
+    "REVISAR",
+    "FILA SIN EVENTOS",
+]
+_CATEGORIAS_NORMALIZADAS = {normalizar_texto(c): c for c in CATEGORIAS}
+
+_PENSAMIENTO = re.compile(r"<think>.*?(</think>|$)", re.DOTALL | re.IGNORECASE)
+
+
+def quitar_pensamiento(respuesta):
+    # Los modelos de razonamiento (p. ej. deepseek-r1) anteponen un bloque <think>...</think>.
+    return _PENSAMIENTO.sub("", respuesta).strip()
+
+
+def categoria_valida(tipo):
+    # Devuelve el nombre oficial del tipo de incidente o None si no es uno de la lista. Se
+    # ignoran comillas, puntos y el resaltado en markdown (**TIPO**) alrededor del nombre.
+    return _CATEGORIAS_NORMALIZADAS.get(normalizar_texto(tipo).strip("'\".* "))
+
+
+def validar_resultado(categoria, razon):
+    # Resultado de un incidente con el nombre oficial del tipo. Un tipo vacío o fuera de la
+    # lista queda como ERROR: no se guarda en la cache y se puede reintentar o escalar. El ""
+    # queda reservado para las filas que una etapa todavía no clasificó.
+    if categoria == "ERROR":
+        return categoria, razon
+    valida = categoria_valida(categoria or "")
+    if valida is None:
+        return "ERROR", f"Respuesta sin un tipo de incidente de la lista: {categoria or 'sin tipo'}"
+    return valida, razon
+
+
+# === RESPUESTA DE UN INCIDENTE ===
+def parsear_respuesta(respuesta):
+    tipo_incidente, razon = "", ""
+    for linea in quitar_pensamiento(respuesta).splitlines():
+        if linea.lower().startswith("tipo de incidente:"):
+            tipo_incidente = linea.split(":", 1)[1].strip()
+        elif linea.lower().startswith("razón:") or linea.lower().startswith("razon:"):
+            razon = linea.split(":", 1)[1].strip()
+    return tipo_incidente, razon
+
+
+# === RESPUESTA EN STREAMING ===
+# Campos del objeto JSON que pide PlantillaPrompt.sistema_json y, por si el modelo no respeta
+# el formato, las líneas "Tipo de Incidente:"/"Razón:" ya terminadas en salto de línea.
+_CAMPO_TIPO = re.compile(r'"tipo"\s*:\s*"((?:[^"\\]|\\.)*)"|^\s*tipo de incidente:\s*(.+?)\s*\n', re.IGNORECASE | re.MULTILINE)
+_CAMPO_RAZON = re.compile(r'"raz[oó]n"\s*:\s*"((?:[^"\\]|\\.)*)"|^\s*raz[oó]n:\s*(.+?)\s*\n', re.IGNORECASE | re.MULTILINE)
+
+
+def _campo(patron, texto):
+    coincidencia = patron.search(texto)
+    if coincidencia is None:
+        return None
+    if coincidencia.group(1) is not None:
+        try:
+            return json.loads(f'"{coincidencia.group(1)}"').strip()
+        except ValueError:
+            return coincidencia.group(1).strip()
+    return coincidencia.group(2).strip()
+
+
+class LectorRespuesta:
+    # Lee la respuesta de un incidente a medida que llega. El bloque <think> se ignora aunque
+    # todavía no se haya cerrado, y cada campo queda disponible apenas se completa, sin
+    # esperar al resto de la respuesta.
+    def __init__(self):
+        self.texto = ""
+        self.categoria = None
+        self.razon = None
+
+    def agregar(self, fragmento):
+        # Devuelve True si con este fragmento se completó algún campo.
+        self.texto += fragmento
+        antes = (self.categoria, self.razon)
+        visible = quitar_pensamiento(self.texto)
+        if self.categoria is None:
+            self.categoria = _campo(_CAMPO_TIPO, visible)
+        if self.razon is None:
+            self.razon = _campo(_CAMPO_RAZON, visible)
+        return (self.categoria, self.razon) != antes
+
+    @property
+    def completo(self):
+        return self.categoria is not None and self.razon is not None
+
+    def resultado(self):
+        # Al terminar la respuesta: lo leído o, si faltan campos, el parseo de la respuesta entera.
+        if self.completo:
+            return self.categoria, self.razon
+        tipo_incidente, razon = parsear_respuesta(self.texto)
+        return self.categoria or tipo_incidente, self.razon or razon
+
+
+# === RESPUESTA DE VARIOS INCIDENTES ===
+def _objetos_json(respuesta):
+    respuesta = quitar_pensamiento(respuesta)
+    try:
+        datos = json.loads(respuesta)
+        if isinstance(datos, list):
+            return [d for d in datos if isinstance(d, dict)]
+        if isinstance(datos, dict):
+            return [datos]
+    except ValueError:
+        pass
+    objetos = []
+    for fragmento in re.findall(r"\{[^{}]*\}", respuesta):
+        try:
+            objetos.append(json.loads(fragmento))
+        except ValueError:
+            continue
+    return objetos
+
+
+def parsear_respuesta_lote(respuesta, cantidad):
+    # Devuelve una lista de `cantidad` elementos con (tipo, razón) para cada id recibido
+    # correctamente y None para los ids faltantes, repetidos o con un tipo desconocido.
+    resultados = [None] * cantidad
+    vistos = set()
+    for objeto in _objetos_json(respuesta):
+        try:
+            i = int(objeto.get("id")) - 1
+        except (TypeError, ValueError):
+            continue
+        tipo = categoria_valida(str(objeto.get("tipo", "")))
+        razon = str(objeto.get("razon", objeto.get("razón", ""))).strip()
+        if not 0 <= i < cantidad:
+            continue
+        resultados[i] = None if tipo is None or i in vistos else (tipo, razon)
+        vistos.add(i)
+    return resultados
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+DIRECTORIO_TRABAJOS = os.getenv("TRABAJOS_DIR", "trabajos")
+
+
+# === TRABAJOS DE CLASIFICACIÓN CON PUNTOS DE CONTROL ===
+class Trabajo:
+    # Guarda en disco, fila por fila, el resultado de clasificar un archivo con un backend.
+    # Cada línea de resultados.jsonl tiene el índice de la fila, su estado (OK o ERROR), la
+    # categoría y la razón; si una fila aparece varias veces vale la última. Así un trabajo
+    # interrumpido (rerun de Streamlit, desconexión o caída) se retoma sin repetir filas.
+    def __init__(self, identificador, directorio=DIRECTORIO_TRABAJOS):
+        self.identificador = identificador
+        self.ruta = os.path.join(directorio, identificador)
+        self.ruta_resultados = os.path.join(self.ruta, "resultados.jsonl")
+        self.ruta_meta = os.path.join(self.ruta, "meta.json")
+        self.lock = threading.Lock()
+
+    @classmethod
+    def para_archivo(cls, contenido, columna, backend, directorio=DIRECTORIO_TRABAJOS):
+        # El mismo archivo, columna y modelo siempre corresponden al mismo trabajo.
+        huella = hashlib.sha256()
+        huella.update(contenido)
+        for parte in (str(columna), backend.etiqueta, backend.modelo, backend.version_prompt):
+            huella.update(b"\x1f" + parte.encode("utf-8"))
+        return cls(huella.hexdigest()[:16], directorio)
+
+    def iniciar(self, **meta):
+        os.makedirs(self.ruta, exist_ok=True)
+        if not os.path.exists(self.ruta_meta):
+            with open(self.ruta_meta, "w", encoding="utf-8") as f:
+                json.dump({"creado": time.time(), **meta}, f, ensure_ascii=False)
+
+    def registrar(self, registros):
+        # `registros` es una lista de (fila, categoria, razon).
+        lineas = "".join(
+            json.dumps(
+                {
+                    "fila": int(fila),
+                    "estado": "ERROR" if categoria == "ERROR" else "OK",
+                    "categoria": categoria,
+                    "razon": razon,
+                },
+                ensure_ascii=False,
+            ) + "\n"
+            for fila, categoria, razon in registros
+        )
+        if not lineas:
+            return
+        with self.lock:
+            os.makedirs(self.ruta, exist_ok=True)
+            with open(self.ruta_resultados, "a", encoding="utf-8") as f:
+                f.write(lineas)
+
+    def resultados(self):
+        # Devuelve {fila: (estado, categoria, razon)}. Una última línea cortada por una
+        # caída a mitad de escritura se ignora.
+        resultados = {}
+        if not os.path.exists(self.ruta_resultados):
+            return resultados
+        with open(self.ruta_resultados, encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    continue
+                resultados[registro["fila"]] = (registro["estado"], registro["categoria"], registro["razon"])
+        return resultados
+
+    def descartar(self):
+        shutil.rmtree(self.ruta, ignore_errors=True)
+
+
+def filas_pendientes(resultados, total, reintentar_errores=False):
+    # Filas sin resultado y, si se pide, también las que terminaron con ERROR.
+    return [
+        i for i in range(total)
+        if i not in resultados or (reintentar_errores and resultados[i][0] == "ERROR")
+    ]
+
+
+def columnas_resultado(resultados, total):
+    # Arma las columnas de salida; las filas todavía no clasificadas quedan vacías.
+    categorias = [""] * total
+    razones = [""] * total
+    for fila, (_, categoria, razon) in resultados.items():
+        if 0 <= fila < total:
+            categorias[fila] = categoria
+            razones[fila] = razon
+    return categorias, razones